@@ -0,0 +1,312 @@
+import argparse
+import base64
+import contextlib
+import functools
+import gc
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+BASELINE = 'benchmark_baseline.json'
+
+# Stages faster than this are too noisy to count as regressions
+MIN_COMPARED_SECONDS = 0.005
+
+GENRES = ['Indie', 'Adventure', 'RPG', 'Shooter', 'Platform', 'Strategy', 'Puzzle', 'Simulator',
+          'Arcade', 'Turn Based Strategy', 'Visual Novel', 'Fighting', 'Racing', 'Sport',
+          'Tactical', 'Brawler', 'Point-and-Click', 'Music', 'Card & Board Game', 'Real Time Strategy', 'Quiz/Trivia']
+PLATFORMS = ['Windows PC', 'Linux', 'Mac', 'Web browser', 'PlayStation 4', 'Xbox One', 'Nintendo Switch',
+             'PlayStation 3', 'Xbox 360', 'Android', 'iOS', 'Wii U', 'Nintendo 3DS', 'PlayStation 5']
+# Developers whose names put them in a platform-holder category of the rating comparison chart
+PLATFORM_HOLDER_DEVELOPERS = ['Sony Interactive Entertainment', 'Microsoft Game Studios', 'Nintendo EPD',
+                              'Sony Santa Monica', 'Nintendo R&D1']
+
+# Date ranges the callbacks are called with, all ending on END_DATE
+END_DATE = pd.Timestamp('2024-03-19')
+DATE_RANGES = {'1 month': 31, '1 year': 365, '5 years': 5 * 365, 'all': None}
+
+
+def load_module(filename):
+    # The project scripts start with a digit, so they are loaded from their file paths
+    spec = importlib.util.spec_from_file_location(os.path.splitext(filename)[0].lstrip('0123456789_'), os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Synthetic catalog with the shape of the raw tables: a few duplicated game names, the 6969-06-09
+# placeholder date, publisher + developer rows per id, invalid developer names, and games with
+# several genres and platforms following a skewed popularity.
+
+def skewed_choice(rng, size, n):
+    # Indexes in [0, n) where low indexes are much more common
+    weights = 1 / np.arange(1, n + 1)
+    return rng.choice(n, size=size, p=weights / weights.sum())
+
+def label_table(rng, ids, labels, most, column):
+    # 1 to `most` distinct, consecutive labels per id
+    counts = rng.integers(1, most + 1, size=len(ids))
+    first = np.repeat(skewed_choice(rng, len(ids), len(labels)), counts)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return pd.DataFrame({'id': np.repeat(ids, counts), column: np.asarray(labels, dtype=object)[(first + within) % len(labels)]})
+
+def counter(rng, rows, scale):
+    # Heavy-tailed counts, like plays and wishlists
+    return (rng.pareto(1.2, size=rows) * scale).astype(np.int64)
+
+def generate_catalog(rows, directory, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, rows + 1)
+
+    names = np.char.add('Game ', ids.astype(str)).astype(object)
+    # 1% of the games reuse the name of another game
+    reused = rng.random(rows) < 0.01
+    names[reused] = names[rng.integers(0, rows, size=int(reused.sum()))]
+
+    days = rng.integers(0, (END_DATE - pd.Timestamp('1980-01-01')).days + 1, size=rows)
+    dates = (pd.Timestamp('1980-01-01') + pd.to_timedelta(days, unit='D')).strftime('%Y-%m-%d').to_numpy(dtype=object)
+    placeholder = rng.random(rows)
+    dates[placeholder < 0.005] = '6969-06-09'
+    dates[(placeholder >= 0.005) & (placeholder < 0.01)] = 'TBD'
+
+    rating = np.round(rng.uniform(0.5, 5, size=rows), 1)
+    rating[rng.random(rows) < 0.05] = np.nan
+    description = np.char.add('A game about ', rng.choice(GENRES, size=rows)).astype(object)
+    description[rng.random(rows) < 0.1] = None
+
+    games = pd.DataFrame({
+        'id': ids, 'name': names, 'date': dates, 'rating': rating,
+        'reviews': counter(rng, rows, 20), 'plays': counter(rng, rows, 500), 'playing': counter(rng, rows, 5),
+        'backlogs': counter(rng, rows, 50), 'wishlists': counter(rng, rows, 50), 'description': description,
+    })
+
+    # One developer per 20 games; 30% of the ids list a publisher first, 1% of the names are invalid
+    pool = np.char.add('Studio ', np.arange(max(rows // 20, 1)).astype(str)).astype(object)
+    pool[:len(PLATFORM_HOLDER_DEVELOPERS)] = PLATFORM_HOLDER_DEVELOPERS[:len(pool)]
+    invalid = rng.random(len(pool)) < 0.01
+    pool[invalid] = pool[invalid] + ' ™'
+    publisher_first = rng.random(rows) < 0.3
+    developers = pd.DataFrame({
+        'id': np.concatenate([ids[publisher_first], ids]),
+        'developer': np.concatenate([np.full(int(publisher_first.sum()), 'Big Publisher', dtype=object),
+                                     pool[skewed_choice(rng, rows, len(pool))]]),
+    })
+    developers = developers.iloc[np.argsort(developers['id'].to_numpy(), kind='mergesort')]
+
+    tables = {
+        'games': games,
+        'developers': developers,
+        'genres': label_table(rng, ids, GENRES, 3, 'genre'),
+        'platforms': label_table(rng, ids, PLATFORMS, 4, 'platform'),
+    }
+    for name, table in tables.items():
+        table.to_csv(os.path.join(directory, f'{name}.csv'), index=False)
+
+
+# Timing
+
+def time_call(function, args):
+    # Wall time of one untraced call; as in timeit, the garbage collector is off during the call
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        function(*args)
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def peak_call(function, args):
+    # Peak traced Python/numpy allocation of one call in MB; tracing slows calls down several times,
+    # so these calls are never timed
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def measure_stages(stages, repeat):
+    # {stage: {'seconds', 'peak_mb'}} of (stage, function, setup) triples; setup runs untimed before every
+    # call and returns the call's arguments. The stages are timed in `repeat` interleaved rounds and the
+    # median per stage is kept, so a slow spell of the machine costs one round of every stage, which the
+    # median discards, rather than every call of the stages it happens to overlap.
+    seconds = {stage: [] for stage, _, _ in stages}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            for stage, function, setup in stages:
+                seconds[stage].append(time_call(function, setup()))
+        peaks = {stage: peak_call(function, setup()) for stage, function, setup in stages}
+    return {stage: {'seconds': float(np.median(seconds[stage])), 'peak_mb': peaks[stage]} for stage, _, _ in stages}
+
+
+def record(results, stage, rows, timing):
+    timing['rows_per_s'] = rows / max(timing['seconds'], 1e-9)
+    results[stage] = timing
+    print(f"  {stage:<48} {timing['seconds'] * 1000:>10.1f} ms {timing['rows_per_s']:>14,.0f} rows/s {timing['peak_mb']:>9.1f} MB")
+
+
+def arguments(*args):
+    return lambda: args
+
+
+def copies(*tables):
+    # Every call gets fresh copies of the tables it is given
+    return lambda: tuple(table.copy() for table in tables)
+
+
+def benchmark_cleaning(cleaner, rows, results, repeat):
+    # Inputs of the later stages, made once untimed
+    with contextlib.redirect_stdout(io.StringIO()):
+        inputs = cleaner.read_inputs()
+        combined_df = cleaner.clean_tables(**{name: table.copy() for name, table in inputs.items()})
+        cleaner.write_outputs(combined_df)
+        cleaner.write_manifest(cleaner.content_hashes(inputs))
+
+    stages = [
+        ('clean: read_inputs', cleaner.read_inputs, arguments()),
+        ('clean: clean_developers', cleaner.clean_developers, copies(inputs['developers'])),
+        ('clean: concatenate_labels genre', cleaner.concatenate_labels, lambda: (inputs['genres'].copy(), 'genre')),
+        ('clean: concatenate_labels platform', cleaner.concatenate_labels, lambda: (inputs['platforms'].copy(), 'platform')),
+        ('clean: clean_dates', cleaner.clean_dates, copies(inputs['games'])),
+        ('clean: clean_tables', lambda tables: cleaner.clean_tables(**tables), lambda: ({name: table.copy() for name, table in inputs.items()},)),
+        ('clean: write_outputs', cleaner.write_outputs, copies(combined_df)),
+        ('clean: streaming', cleaner.clean_streaming, arguments(max(rows // 10, 1000))),
+        # Streaming rewrites the outputs the manifest describes, so nothing has changed
+        ('clean: incremental, nothing changed', cleaner.clean_incremental, arguments()),
+    ]
+    for stage, timing in measure_stages(stages, repeat).items():
+        record(results, stage, rows, timing)
+
+
+def benchmark_dashboard(project, rows, results, repeat):
+    uploads = {'csv': cleaner_output_upload('cleaned_games.csv')}
+    if os.path.exists('cleaned_games.parquet'):
+        uploads['parquet'] = cleaner_output_upload('cleaned_games.parquet')
+
+    def forget_upload(contents, filename):
+        # Every registration parses the upload again
+        key = hashlib.sha1(contents.encode('utf-8')).hexdigest()
+        with project._dataset_store_lock:
+            _, size = project._dataset_store.pop(key, (None, 0))
+            project._dataset_store_bytes -= size
+        return contents, filename
+
+    def empty_aggregate_cache(*args):
+        project._aggregate_cache.clear()
+        return args
+
+    # The Overview and Feedback tabs are computed by background jobs; their computations are timed directly
+    def no_progress(done, total):
+        pass
+
+    stages = [(f'dashboard: register_dataset {kind}', project.register_dataset, functools.partial(forget_upload, *upload))
+              for kind, upload in uploads.items()]
+
+    dataset_id = project.register_dataset(*uploads['csv'])
+    callbacks = {
+        'compute_overview': lambda start, end: project.compute_overview(no_progress, dataset_id, start, end),
+        'update_relationship_tab': lambda start, end: project.update_relationship_tab(start, end, dataset_id, 'relationship', None),
+        'compute_feedback': lambda start, end: project.compute_feedback(no_progress, dataset_id, start, end),
+    }
+    for width, days in DATE_RANGES.items():
+        start = '1900-01-01' if days is None else (END_DATE - pd.Timedelta(days=days)).strftime('%Y-%m-%d')
+        end = END_DATE.strftime('%Y-%m-%d')
+        for name, callback in callbacks.items():
+            # Calls with an empty aggregate cache, and calls that find their aggregates cached
+            stages.append((f'dashboard: {name} {width}, cold', callback, functools.partial(empty_aggregate_cache, start, end)))
+            stages.append((f'dashboard: {name} {width}, warm', callback, arguments(start, end)))
+
+    stages.append(('dashboard: display_top_games_by_plays', project.display_top_games_by_plays, arguments({'points': [{'x': GENRES[0]}]}, dataset_id)))
+    stages.append(('dashboard: suggest_games', project.suggest_games, arguments('Game 1', dataset_id)))
+
+    for stage, timing in measure_stages(stages, repeat).items():
+        record(results, stage, rows, timing)
+
+
+def cleaner_output_upload(filename):
+    # A cleaned output file as dcc.Upload would send it: (data URL, filename)
+    with open(filename, 'rb') as file:
+        encoded = base64.b64encode(file.read()).decode('ascii')
+    return f'data:application/octet-stream;base64,{encoded}', filename
+
+
+def compare(results, baseline, tolerance):
+    # Stages that got slower than `tolerance` times their baseline
+    regressions = []
+    for rows, stages in results.items():
+        for stage, timing in stages.items():
+            previous = baseline.get(rows, {}).get(stage)
+            if previous is None or max(timing['seconds'], previous['seconds']) < MIN_COMPARED_SECONDS:
+                continue
+            ratio = timing['seconds'] / max(previous['seconds'], 1e-9)
+            if ratio > tolerance:
+                regressions.append(f"{rows} rows, {stage}: {previous['seconds'] * 1000:.1f} ms -> {timing['seconds'] * 1000:.1f} ms ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the cleaning pipeline and the dashboard callbacks on synthetic catalogs.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000],
+                        help='catalog sizes to generate, e.g. 10000 100000 1000000 10000000')
+    parser.add_argument('--repeat', type=int, default=5, help='timed calls per dashboard stage, callback and date range (the median is reported)')
+    parser.add_argument('--clean-repeat', type=int, default=3, help='timed calls per cleaning stage (the median is reported)')
+    parser.add_argument('--data-dir', default=None, help='keep the generated tables and outputs here instead of a temporary directory')
+    parser.add_argument('--skip-dashboard', action='store_true', help='only benchmark the cleaning pipeline')
+    parser.add_argument('--save-baseline', nargs='?', const=BASELINE, default=None, help=f'save the results as the baseline (default {BASELINE})')
+    parser.add_argument('--compare', nargs='?', const=BASELINE, default=None, help=f'compare with a saved baseline (default {BASELINE})')
+    parser.add_argument('--tolerance', type=float, default=1.25, help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    cleaner = load_module('5202_CleanData.py')
+    project = None if args.skip_dashboard else load_module('5202_Project.py')
+
+    results = {}
+    cwd = os.getcwd()
+    with contextlib.ExitStack() as stack:
+        root = args.data_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        for rows in args.rows:
+            directory = os.path.join(root, str(rows))
+            os.makedirs(directory, exist_ok=True)
+            print(f"{rows:,} games")
+            generate_catalog(rows, directory)
+
+            # The cleaner reads and writes in the working directory
+            os.chdir(directory)
+            try:
+                results[str(rows)] = {}
+                benchmark_cleaning(cleaner, rows, results[str(rows)], args.clean_repeat)
+                if project is not None:
+                    benchmark_dashboard(project, rows, results[str(rows)], args.repeat)
+            finally:
+                os.chdir(cwd)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"No stage is more than {args.tolerance:.2f}x slower than {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
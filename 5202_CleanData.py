@@ -1,15 +1,32 @@
 import pandas as pd
 import re
 import numpy as np
+import argparse
+import sys
+import time
+
+OUTPUT_CSV = 'cleaned_games.csv'
+OUTPUT_PARQUET = 'cleaned_games.parquet'
+MANIFEST = 'cleaned_games.manifest.csv'
+DEVELOPER_DIMENSION = 'cleaned_developers.csv'
+
+COUNTER_COLUMNS = ['reviews', 'plays', 'playing', 'backlogs', 'wishlists']
 
-developers = pd.read_csv('developers.csv')
-platforms = pd.read_csv('platforms.csv')
-genres = pd.read_csv('genres.csv')
-games = pd.read_csv('games.csv')
 
 # Retain only the second developer data for each id, as the first is usually the publisher
 
 def clean_duplicates(dataframe):
+    # Vectorized: position of each row within its id, and the number of rows with that id
+    position = dataframe.groupby('id').cumcount()
+    size = dataframe.groupby('id')['id'].transform('size')
+
+    # Keep ids that appear once, the second row of duplicated ids, and rows without an id
+    keep = (size == 1) | (position == 1) | dataframe['id'].isna()
+
+    return dataframe[keep].reset_index(drop=True)
+
+def clean_duplicates_loop(dataframe):
+    # Original row-by-row version, kept as the reference for --check
     counts = dataframe['id'].value_counts()
     duplicates = counts[counts > 1].index
 
@@ -22,76 +39,378 @@ def clean_duplicates(dataframe):
 
     return dataframe.reset_index(drop=True)
 
-cleaned_developers = clean_duplicates(developers)
-
 
 # Clean up abnormalities in developer names
 
+VALID_NAME = re.compile(r"[A-Za-z\s\-,\.&()_'/:0-9]+")
+
+def valid_names(names):
+    # Vectorized full match of every name against the precompiled pattern, missing names are invalid
+    return names.str.fullmatch(VALID_NAME, na=False)
+
 def is_valid_name(s):
+    # Original per-name version, kept as the reference for --check
     if pd.isna(s):
         return False
     return bool(re.fullmatch(r"[A-Za-z\s\-,\.&()_'/:0-9]+", s))
 
-cleaned_developers['developer'] = cleaned_developers['developer'].apply(lambda x: pd.NA if not is_valid_name(x) else x)
+def clean_developers(developers):
+    cleaned_developers = clean_duplicates(developers)
+    cleaned_developers['developer'] = cleaned_developers['developer'].where(valid_names(cleaned_developers['developer']), pd.NA)
+    return cleaned_developers
 
 
-# Concatenate platforms and genres data into a string for each id
+# Developer dimension: one row per distinct developer with an integer code and a category.
+# The first rule whose pattern (a case-insensitive regular expression) occurs in the name gives the category.
+
+DEVELOPER_CATEGORY_RULES = [
+    ('Sony', 'Sony'),
+    ('Microsoft', 'Microsoft'),
+    ('Nintendo', 'Nintendo'),
+]
+DEVELOPER_DEFAULT_CATEGORY = 'Others'
+
+def classify_developers(names, rules=DEVELOPER_CATEGORY_RULES):
+    category = pd.Series(DEVELOPER_DEFAULT_CATEGORY, index=names.index, dtype=object)
+    # Later rules are applied first so the first matching rule wins
+    for pattern, label in reversed(rules):
+        category[names.str.contains(pattern, case=False, na=False)] = label
+    return category
+
+def build_developer_dimension(developers, rules=DEVELOPER_CATEGORY_RULES):
+    names = pd.Series(developers.dropna().unique(), dtype=object).sort_values(ignore_index=True)
+    return pd.DataFrame({
+        'developer_code': np.arange(len(names)),
+        'developer': names,
+        'category': classify_developers(names, rules),
+    })
+
+def encode_developers(developers, dimension):
+    # Categorical whose codes are the dimension's developer codes
+    return pd.Categorical(developers, categories=dimension['developer'])
 
-grouped_platforms = platforms.groupby('id')['platform'].apply(lambda x: ', '.join(x)).reset_index()
 
-grouped_genres = genres.groupby('id')['genre'].apply(lambda x: ', '.join(x)).reset_index()
+# Concatenate platforms and genres data into a string for each id
+
+def concatenate_labels(dataframe, column):
+    return dataframe.groupby('id')[column].apply(lambda x: ', '.join(x)).reset_index()
 
 
 # Remove the irregularity from the date column
 
-games['date'] = pd.to_datetime(games['date'], errors='coerce', format='%Y-%m-%d')
-games['date'] = games['date'].replace(pd.Timestamp('6969-06-09'), pd.NaT)
+def clean_dates(games):
+    games['date'] = pd.to_datetime(games['date'], errors='coerce', format='%Y-%m-%d')
+    games['date'] = games['date'].replace(pd.Timestamp('6969-06-09'), pd.NaT)
+    return games
 
 
-# Retain only the first row for each game
+# Change data types and adjust the variable order
 
-unique_games = games.drop_duplicates(subset=['name'])
+def finalize_columns(combined_df):
+    for column in COUNTER_COLUMNS:
+        combined_df[column] = pd.to_numeric(combined_df[column], errors='coerce').fillna(0).astype(int)
 
+    cols = [col for col in combined_df.columns if col not in ['genre', 'developer', 'platform']]
+    date_index = cols.index('date')
+    new_cols = cols[:date_index + 1] + ['genre', 'developer', 'platform'] + cols[date_index + 1:]
 
-# Combine all dataframes, with games as the primary one
+    return combined_df[new_cols]
 
-combined_df = pd.merge(unique_games, cleaned_developers, on='id', how='left')
-combined_df = pd.merge(combined_df, grouped_genres, on='id', how='left')
-combined_df = pd.merge(combined_df, grouped_platforms, on='id', how='left')
 
+# Throughput and memory reporting
 
-# Change data types and adjust the variable order
+def peak_rss_mb():
+    # Peak resident set size of this process, None where the resource module is unavailable (Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+def report(label, rows, start):
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+    peak_text = f", peak RSS {peak:.0f} MB" if peak is not None else ""
+    print(f"{label}: {rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s){peak_text}")
+
+
+def read_inputs():
+    return {
+        'developers': pd.read_csv('developers.csv'),
+        'platforms': pd.read_csv('platforms.csv'),
+        'genres': pd.read_csv('genres.csv'),
+        'games': pd.read_csv('games.csv'),
+    }
+
+def clean_tables(developers, platforms, genres, games):
+    cleaned_developers = clean_developers(developers)
+
+    grouped_platforms = concatenate_labels(platforms, 'platform')
+    grouped_genres = concatenate_labels(genres, 'genre')
+
+    games = clean_dates(games.copy())
+
+    # Retain only the first row for each game
+
+    unique_games = games.drop_duplicates(subset=['name'])
+
+
+    # Combine all dataframes, with games as the primary one
+
+    combined_df = pd.merge(unique_games, cleaned_developers, on='id', how='left')
+    combined_df = pd.merge(combined_df, grouped_genres, on='id', how='left')
+    combined_df = pd.merge(combined_df, grouped_platforms, on='id', how='left')
+
+    return finalize_columns(combined_df)
+
+def write_outputs(combined_df):
+    combined_df.to_csv(OUTPUT_CSV, index=False)
+
+    dimension = build_developer_dimension(combined_df['developer'])
+    dimension.to_csv(DEVELOPER_DIMENSION, index=False)
+
+    # Typed columnar copy for the dashboard: int counters, datetime64 date and a dictionary-encoded
+    # developer whose codes are the developer codes, so loading it needs no text parsing or date conversion
+    try:
+        combined_df.assign(developer=encode_developers(combined_df['developer'], dimension)).to_parquet(OUTPUT_PARQUET, index=False)
+    except ImportError:
+        print("pyarrow is not installed, skipping cleaned_games.parquet")
+
+
+def clean_full(check=False):
+    start = time.perf_counter()
+
+    inputs = read_inputs()
+    developers = inputs['developers']
+    games = inputs['games']
+
+    combined_df = clean_tables(**inputs)
+
+    print(combined_df.head())
+
+
+    #Testing
+
+    write_outputs(combined_df)
+
+    report('Cleaned games', len(games), start)
+
+    if check:
+        # Regression check: the vectorized steps must give the same developers table as the original loops
+        start = time.perf_counter()
+        vectorized = clean_developers(developers)
+        vectorized_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reference = clean_duplicates_loop(developers)
+        reference['developer'] = reference['developer'].apply(lambda x: pd.NA if not is_valid_name(x) else x)
+        reference_time = time.perf_counter() - start
+
+        pd.testing.assert_frame_equal(vectorized, reference)
+        print(f"Developer cleaning matches the original: {vectorized_time:.3f}s vectorized vs {reference_time:.3f}s row by row")
+
+    start_date = '1900-01-01'
+    end_date = '2024-03-19'
+
+    filtered_df = combined_df[(combined_df['date'] >= pd.to_datetime(start_date)) & (combined_df['date'] <= pd.to_datetime(end_date))]
+
+    average = filtered_df['rating'].mean()
+
+    print(average)
+
+    num_games = len(filtered_df)
+
+    print(f"Number of games: {num_games}")
+
+    num_descriptions = filtered_df['description'].notna().sum()
 
-columns_to_convert = ['reviews', 'plays', 'playing', 'backlogs', 'wishlists']
-for column in columns_to_convert:
-    combined_df[column] = pd.to_numeric(combined_df[column], errors='coerce').fillna(0).astype(int)
+    print(f"Number of descriptions: {num_descriptions}")
 
-cols = [col for col in combined_df.columns if col not in ['genre', 'developer', 'platform']]
-date_index = cols.index('date')
-new_cols = cols[:date_index + 1] + ['genre', 'developer', 'platform'] + cols[date_index + 1:]
 
-combined_df = combined_df[new_cols]
+# Streaming mode: games.csv is read and written in bounded chunks, so peak memory stays flat
+# however large the catalog is. The small side tables become id-indexed lookups that each chunk
+# maps against, instead of merges that copy the whole table three times.
 
-print(combined_df.head())
+def build_lookups():
+    cleaned_developers = clean_developers(pd.read_csv('developers.csv'))
+    cleaned_developers = cleaned_developers[cleaned_developers['id'].notna()]
 
+    return {
+        'developer': pd.Series(cleaned_developers['developer'].to_numpy(), index=cleaned_developers['id']),
+        'genre': concatenate_labels(pd.read_csv('genres.csv'), 'genre').set_index('id')['genre'],
+        'platform': concatenate_labels(pd.read_csv('platforms.csv'), 'platform').set_index('id')['platform'],
+    }
 
-#Testing
+def open_parquet_writer(table):
+    # Later chunks are cast to this schema: developer is dictionary-encoded and
+    # columns that are empty in the first chunk are typed as strings
+    import pyarrow as pa
+    import pyarrow.parquet as pq
 
-combined_df.to_csv('cleaned_games.csv', index=False)
+    fields = []
+    for field in table.schema:
+        if field.name == 'developer':
+            field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+        elif pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    schema = pa.schema(fields, metadata=table.schema.metadata)
 
-start_date = '1900-01-01'
-end_date = '2024-03-19'
+    return pq.ParquetWriter(OUTPUT_PARQUET, schema), schema
 
-filtered_df = combined_df[(combined_df['date'] >= pd.to_datetime(start_date)) & (combined_df['date'] <= pd.to_datetime(end_date))]
+def sorted_contains(sorted_values, values):
+    # Membership of each value in a sorted array by binary search; np.isin would sort the whole array again
+    positions = np.searchsorted(sorted_values, values)
+    found = np.zeros(len(values), dtype=bool)
+    inside = positions < len(sorted_values)
+    found[inside] = sorted_values[positions[inside]] == values[inside]
+    return found
 
-average = filtered_df['rating'].mean()
 
-print(average)
+def clean_streaming(chunksize):
+    start = time.perf_counter()
+    lookups = build_lookups()
+    report('Built developer, genre and platform lookups', sum(len(lookup) for lookup in lookups.values()), start)
 
-num_games = len(filtered_df)
+    # Every cleaned developer is in the dimension, so all chunks share its codes
+    dimension = build_developer_dimension(lookups['developer'])
+    dimension.to_csv(DEVELOPER_DIMENSION, index=False)
 
-print(f"Number of games: {num_games}")
+    # 64-bit hashes of the names seen in earlier chunks, kept sorted, so only the first row of each game is
+    # kept across the whole file; 8 bytes per game instead of a Python string (collisions are negligible at 2**64)
+    seen_names = np.empty(0, dtype=np.uint64)
+    writer = schema = None
+    rows_in = rows_out = 0
 
-num_descriptions = filtered_df['description'].notna().sum()
+    try:
+        for chunk in pd.read_csv('games.csv', chunksize=chunksize):
+            rows_in += len(chunk)
 
-print(f"Number of descriptions: {num_descriptions}")
+            chunk = clean_dates(chunk)
+            chunk = chunk.drop_duplicates(subset=['name'])
+            name_hashes = pd.util.hash_pandas_object(chunk['name'], index=False).to_numpy()
+            seen = sorted_contains(seen_names, name_hashes)
+            chunk = chunk[~seen]
+            new_names = np.sort(name_hashes[~seen])
+            seen_names = np.insert(seen_names, np.searchsorted(seen_names, new_names), new_names)
+
+            for column in ('developer', 'genre', 'platform'):
+                chunk[column] = chunk['id'].map(lookups[column])
+            chunk = finalize_columns(chunk)
+
+            chunk.to_csv(OUTPUT_CSV, index=False, mode='w' if rows_out == 0 else 'a', header=rows_out == 0)
+
+            try:
+                import pyarrow as pa
+                table = pa.Table.from_pandas(chunk.assign(developer=encode_developers(chunk['developer'], dimension)), preserve_index=False)
+                if writer is None:
+                    writer, schema = open_parquet_writer(table)
+                writer.write_table(table.cast(schema))
+            except ImportError:
+                pass
+
+            rows_out += len(chunk)
+            report(f'Chunk done, {rows_out} games written', rows_in, start)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        print("pyarrow is not installed, skipping cleaned_games.parquet")
+    report('Cleaned games', rows_in, start)
+
+
+# Incremental mode: a manifest keeps a content hash per game id. The next run re-cleans only the
+# ids whose rows changed in any input table and patches them into the existing cleaned output.
+
+def content_hashes(inputs):
+    # One hash per game id over its rows in all four input tables, sensitive to the row order within an id
+    game_ids = inputs['games']['id'].dropna().unique()
+
+    per_table = {}
+    for name, table in inputs.items():
+        positioned = table.assign(_position=table.groupby('id').cumcount())
+        row_hashes = pd.Series(pd.util.hash_pandas_object(positioned, index=False).to_numpy(), index=table['id'].to_numpy())
+        # Sums wrap around in uint64; ids without rows in this table hash to 0
+        per_table[name] = row_hashes.groupby(level=0).sum().reindex(game_ids, fill_value=0)
+
+    per_table = pd.DataFrame(per_table, index=game_ids)
+    return pd.Series(pd.util.hash_pandas_object(per_table, index=True).to_numpy(), index=per_table.index, name='hash')
+
+def write_manifest(hashes):
+    hashes.rename_axis('id').reset_index().to_csv(MANIFEST, index=False)
+
+def read_cleaned_output():
+    # Text columns stay strings so names like '1942' compare equal to the freshly cleaned rows
+    cleaned = pd.read_csv(OUTPUT_CSV, dtype={column: str for column in ('name', 'genre', 'developer', 'platform', 'description')})
+    cleaned['date'] = pd.to_datetime(cleaned['date'], errors='coerce')
+    return cleaned
+
+def clean_incremental():
+    import os
+
+    if not (os.path.exists(MANIFEST) and os.path.exists(OUTPUT_CSV)):
+        print(f"No {MANIFEST} yet, running a full clean first")
+        clean_full()
+        write_manifest(content_hashes(read_inputs()))
+        return
+
+    start = time.perf_counter()
+    inputs = read_inputs()
+    games = inputs['games']
+
+    hashes = content_hashes(inputs)
+    previous = pd.read_csv(MANIFEST, dtype={'hash': 'uint64'}).set_index('id')['hash']
+
+    common_ids = hashes.index.intersection(previous.index)
+    modified_ids = common_ids[hashes[common_ids].to_numpy() != previous[common_ids].to_numpy()]
+    changed_ids = hashes.index.difference(previous.index).union(modified_ids)
+    removed_ids = previous.index.difference(hashes.index)
+    cleaned = read_cleaned_output()
+
+    # Keeping only the first game per name depends on other ids with the same name,
+    # so every id that shares a name with a changed or removed game is re-cleaned as well
+    dirty_names = pd.concat([
+        games.loc[games['id'].isin(changed_ids), 'name'],
+        cleaned.loc[cleaned['id'].isin(changed_ids.union(removed_ids)), 'name'],
+    ])
+    dirty_ids = changed_ids.union(pd.Index(games.loc[games['name'].isin(dirty_names), 'id'].unique()))
+
+    if len(dirty_ids) == 0 and len(removed_ids) == 0:
+        report('Nothing changed, cleaned games', 0, start)
+        return
+
+    # Re-clean the dirty ids only; every step before the name de-duplication works per id
+    patch = clean_tables(**{name: table[table['id'].isin(dirty_ids)] for name, table in inputs.items()})
+    kept = cleaned[~cleaned['id'].isin(dirty_ids.union(removed_ids))]
+
+    # Put the patched rows back in games.csv order and keep the first game per name, as a full run does
+    position = pd.Series(np.arange(len(games)), index=games['id'].to_numpy()).groupby(level=0).first()
+    combined_df = pd.concat([kept, patch], ignore_index=True)
+    combined_df = combined_df.iloc[np.argsort(combined_df['id'].map(position).to_numpy(), kind='mergesort')]
+    combined_df = combined_df.drop_duplicates(subset=['name']).reset_index(drop=True)
+
+    write_outputs(combined_df)
+    write_manifest(hashes)
+    print(f"{len(changed_ids)} changed or new ids, {len(removed_ids)} removed ids, {len(dirty_ids)} ids re-cleaned")
+    report('Patched cleaned games', len(patch), start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Clean the raw games, developers, genres and platforms tables.')
+    parser.add_argument('--check', action='store_true',
+                        help='compare the vectorized cleaning steps with the original row-by-row versions and time both')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='stream games.csv in chunks of this many rows with flat peak memory')
+    parser.add_argument('--incremental', action='store_true',
+                        help=f'only re-clean game ids that are new or changed since the last run, tracked in {MANIFEST}')
+    args = parser.parse_args()
+
+    if args.incremental:
+        clean_incremental()
+    elif args.chunksize:
+        clean_streaming(args.chunksize)
+    else:
+        clean_full(check=args.check)
@@ -0,0 +1,275 @@
+import argparse
+import base64
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Interactions of one simulated analyst, in order; date sweeps pick random ranges
+SCRIPT = ['upload', 'dates', 'dates', 'tab:relationship', 'dates', 'tab:feedback', 'genre_click',
+          'dates', 'search', 'tab:overview', 'dates']
+# Interval between polls of a running background job, as the dashboard's dcc.Interval
+POLL_SECONDS = 0.3
+
+
+def load_module(filename):
+    # The project scripts start with a digit, so they are loaded from their file paths
+    spec = importlib.util.spec_from_file_location(os.path.splitext(filename)[0].lstrip('0123456789_'), os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_upload(rows, directory):
+    # Cleaned synthetic catalog from the benchmark generator and the cleaner
+    benchmark = load_module('5202_Benchmark.py')
+    cleaner = load_module('5202_CleanData.py')
+    benchmark.generate_catalog(rows, directory)
+
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            cleaner.clean_full()
+    finally:
+        os.chdir(cwd)
+    return os.path.join(directory, 'cleaned_games.csv')
+
+
+# The dashboard on a threaded werkzeug server. It runs in its own interpreter, so the clients'
+# JSON encoding of the uploads does not compete with the server for the GIL and skew its latencies.
+SERVE_APP = """
+import importlib, logging, signal, sys
+sys.path.insert(0, {here!r})
+from werkzeug.serving import run_simple
+# One log line per request would drown the report
+logging.getLogger('werkzeug').setLevel(logging.ERROR)
+# Exit normally when stopped, so the app's exit handlers (its private job directory) run
+signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+run_simple('127.0.0.1', {port}, importlib.import_module('5202_Project').server, threaded=True)
+"""
+# Seconds the server gets to import the app and start listening
+SERVER_START_TIMEOUT = 60
+
+
+def start_local_server(port):
+    # The server process and its URL, once it answers
+    server = subprocess.Popen([sys.executable, '-c', SERVE_APP.format(here=HERE, port=port)], cwd=HERE, stdout=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while True:
+        if server.poll() is not None:
+            raise SystemExit(f'The dashboard server exited with status {server.returncode}')
+        try:
+            with urllib.request.urlopen(f'{url}/_dash-layout'):
+                return server, url
+        except urllib.error.URLError:
+            if time.monotonic() > deadline:
+                server.kill()
+                raise SystemExit(f'The dashboard server did not answer within {SERVER_START_TIMEOUT}s')
+            time.sleep(0.2)
+
+
+def stop_local_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+# A minimal Dash renderer: it keeps the component properties of one browser session, and when
+# properties change it posts every callback that has one of them as input, then follows the
+# callbacks triggered by their outputs, as the browser does.
+
+def parse_outputs(output):
+    # '..a.x...b.y..' (several outputs) or 'a.x' (one output) -> [('a', 'x'), ...]
+    specs = output[2:-2].split('...') if output.startswith('..') else [output]
+    return [tuple(spec.rsplit('.', 1)) for spec in specs]
+
+
+class Session:
+    def __init__(self, url, dependencies, stats):
+        self.url = url
+        self.dependencies = dependencies
+        self.stats = stats
+        self.props = {('tabs', 'value'): 'overview'}
+
+    def set(self, changes):
+        self.props.update(changes)
+        pending = list(changes)
+        while pending:
+            # Dash de-duplicates callbacks triggered by the same change
+            while pending:
+                triggered = [dependency for dependency in self.dependencies
+                             if any((spec['id'], spec['property']) in pending for spec in dependency['inputs'])]
+                changed, pending = pending, []
+                for dependency in triggered:
+                    pending.extend(self.call(dependency, changed))
+
+            # Background jobs are polled by their enabled intervals until the callbacks disable them
+            ticking = [component for (component, prop), value in self.props.items()
+                       if component.endswith('-job-interval') and prop == 'disabled' and value is False]
+            if ticking:
+                time.sleep(POLL_SECONDS)
+                for component in ticking:
+                    self.props[(component, 'n_intervals')] = (self.props.get((component, 'n_intervals')) or 0) + 1
+                    pending.append((component, 'n_intervals'))
+
+    def call(self, dependency, changed):
+        outputs = parse_outputs(dependency['output'])
+
+        def values(specs):
+            return [{'id': spec['id'], 'property': spec['property'], 'value': self.props.get((spec['id'], spec['property']))} for spec in specs]
+
+        output_specs = [{'id': component, 'property': prop} for component, prop in outputs]
+        body = json.dumps({
+            'output': dependency['output'],
+            'outputs': output_specs if dependency['output'].startswith('..') else output_specs[0],
+            'inputs': values(dependency['inputs']),
+            'state': values(dependency.get('state', [])),
+            'changedPropIds': [f'{component}.{prop}' for component, prop in changed
+                               if any(spec['id'] == component and spec['property'] == prop for spec in dependency['inputs'])],
+        }).encode('utf-8')
+
+        request = urllib.request.Request(f'{self.url}/_dash-update-component', data=body, headers={'Content-Type': 'application/json'})
+        name = ' '.join(f'{component}.{prop}' for component, prop in outputs[:1])
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                payload = response.read()
+        except urllib.error.URLError:
+            self.stats.record(name, time.perf_counter() - start, error=True)
+            return []
+        self.stats.record(name, time.perf_counter() - start)
+
+        # 204: the callback prevented the update
+        if not payload:
+            return []
+        updated = []
+        for component, properties in json.loads(payload).get('response', {}).items():
+            for prop, value in properties.items():
+                self.props[(component, prop)] = value
+                updated.append((component, prop))
+        return updated
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name, seconds, error=False):
+        with self.lock:
+            if error:
+                self.errors[name] += 1
+            else:
+                self.latencies[name].append(seconds)
+
+    def report(self, elapsed):
+        print(f"{'callback (first output)':<40} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        names = sorted(set(self.latencies) | set(self.errors))
+        total = 0
+        for name in names:
+            values = np.array(self.latencies[name]) * 1000
+            total += len(values)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99]) if len(values) else (np.nan,) * 3
+            print(f"{name:<40} {len(values):>9} {self.errors[name]:>7} {len(values) / elapsed:>8.1f} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f}")
+        print(f"{total} requests in {elapsed:.1f}s, {total / elapsed:.1f} requests/s")
+
+
+def read_catalog(path):
+    # The uploaded file, read by its extension like the dashboard does
+    extension = path.lower().rsplit('.', 1)[-1]
+    if extension == 'parquet':
+        return pd.read_parquet(path)
+    if extension in ('feather', 'arrow'):
+        return pd.read_feather(path)
+    return pd.read_csv(path)
+
+
+def run_client(url, dependencies, stats, upload, catalog, iterations, seed):
+    rng = random.Random(seed)
+    session = Session(url, dependencies, stats)
+    dates = catalog['date'].dropna()
+    first, last = dates.min(), dates.max()
+    genres = catalog['genre'].dropna().str.split(', ').explode().unique().tolist()
+    names = catalog['name'].dropna().tolist()
+
+    for _ in range(iterations):
+        for step in SCRIPT:
+            if step == 'upload':
+                session.set({('upload-data', 'contents'): upload[0], ('upload-data', 'filename'): upload[1]})
+            elif step == 'dates':
+                start = first + (last - first) * rng.random()
+                end = start + (last - start) * rng.random()
+                session.set({('date-picker-range', 'start_date'): start.strftime('%Y-%m-%d'),
+                             ('date-picker-range', 'end_date'): end.strftime('%Y-%m-%d')})
+            elif step.startswith('tab:'):
+                session.set({('tabs', 'value'): step[len('tab:'):]})
+            elif step == 'genre_click' and genres:
+                session.set({('genre-distribution-chart', 'clickData'): {'points': [{'x': rng.choice(genres)}]}})
+            elif step == 'search' and names:
+                name = rng.choice(names)
+                session.set({('search-bar', 'value'): name})
+                clicks = (session.props.get(('search-button', 'n_clicks')) or 0) + 1
+                session.set({('search-button', 'n_clicks'): clicks})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay analyst interactions against the dashboard from concurrent clients.')
+    parser.add_argument('--url', default=None, help='dashboard to test, e.g. http://127.0.0.1:8050 (default: start one in a separate process)')
+    parser.add_argument('--port', type=int, default=8051, help='port of the dashboard started by this script')
+    parser.add_argument('--data', default=None, help='games file to upload (CSV, Parquet or Feather/Arrow); default: a synthetic cleaned catalog')
+    parser.add_argument('--rows', type=int, default=100_000, help='size of the synthetic catalog')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent simulated clients')
+    parser.add_argument('--iterations', type=int, default=3, help='times each client replays the interaction script')
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        path = args.data or synthetic_upload(args.rows, stack.enter_context(tempfile.TemporaryDirectory()))
+        with open(path, 'rb') as file:
+            upload = (f"data:application/octet-stream;base64,{base64.b64encode(file.read()).decode('ascii')}", os.path.basename(path))
+        catalog = read_catalog(path)
+        catalog['date'] = pd.to_datetime(catalog['date'], errors='coerce')
+
+        url = args.url
+        if url is None:
+            server, url = start_local_server(args.port)
+            stack.callback(stop_local_server, server)
+
+        with urllib.request.urlopen(f'{url}/_dash-dependencies') as response:
+            dependencies = json.loads(response.read())
+
+        stats = Stats()
+        clients = [threading.Thread(target=run_client, args=(url, dependencies, stats, upload, catalog, args.iterations, seed))
+                   for seed in range(args.clients)]
+        start = time.perf_counter()
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - start
+
+    print(f"{args.clients} clients x {args.iterations} iterations against {url}")
+    stats.report(elapsed)
+
+
+if __name__ == '__main__':
+    main()
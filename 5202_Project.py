@@ -9,24 +9,1266 @@ from dash import dcc, html, State, callback_context
 from dash.dependencies import Input, Output
 import pandas as pd
 import io
+import atexit
 import base64
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+import re
+import shutil
+import sys
+import tempfile
+import traceback
+import bisect
+import threading
+import time
+import functools
+import tracemalloc
+from contextlib import contextmanager, suppress
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import flask
 from datetime import datetime
-import tabulate
+import numpy as np
 import plotly.express as px
-
-
-#新增：cluster analysis所需要的安装包
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.cluster import KMeans
 from dash.exceptions import PreventUpdate
-from dash import dash_table
-from dash.dash_table.Format import Format 
-import plotly.graph_objs as go
+try:
+    import fcntl
+except ImportError:
+    # No file locks on Windows, where the dashboard only runs as a single process
+    fcntl = None
+
+# Start-up time matters for every worker boot (5202_Startup.py checks the budget): the unused
+# scikit-learn, tabulate and dash_table imports were removed, and pyarrow, only needed to share
+# datasets between workers, is imported inside the functions that use it.
 
 app = dash.Dash(__name__)
+# WSGI application, served by 5202_Serve.py in production
+server = app.server
+
+
+# Server-side dataset store: every upload is decoded and parsed once, then shared by all callbacks.
+# Entries are keyed by a hash of the uploaded contents and evicted least-recently-used
+# once the parsed tables together exceed DATASET_STORE_MAX_BYTES.
+# The browser only keeps the hash (the dataset id) in the 'dataset-id' store.
+# Each dataset is kept sorted by date so a date range is a binary search plus a slice.
+# Tables are stored compactly: categorical label columns, Arrow-backed names, narrow numeric dtypes,
+# and descriptions packed into one UTF-8 buffer that is only decoded for the search modal.
+# Genres and platforms are split once at load time into game<->label bridge tables.
+DATASET_STORE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Multi-process serving (5202_Serve.py): each parsed table is also published once to SHARED_DATASET_DIR
+# as an uncompressed Arrow IPC file. Everything built from it (descriptions, bridges, name index, rollup,
+# distinct bitsets, top-game index, developer codes) is published next to it as one file of arrays, with
+# a pickled layout of where each array starts. A worker asked for a dataset id it has not parsed
+# memory-maps those files instead and builds nothing, so every worker reads the same pages; only the
+# columns Arrow cannot hand over without a copy (categories, columns with missing values) are private.
+SHARED_DATASET_DIR = os.environ.get('GAMES_DASHBOARD_SHARED_DIR')
+# The shared directory is usually in RAM (/dev/shm) and outside DATASET_STORE_MAX_BYTES, so it is bounded
+# too: after each publish the least recently used datasets (by the time their table file was last used)
+# are deleted until the published files fit. Workers still mapping a deleted dataset keep it until they evict it.
+SHARED_DATASET_MAX_BYTES = int(os.environ.get('GAMES_DASHBOARD_SHARED_MAX_BYTES', 2 * DATASET_STORE_MAX_BYTES))
+# Temporary files of publishes interrupted longer ago than this are deleted by the same sweep
+SHARED_TEMPORARY_MAX_AGE = 3600
+# Published files and their temporary files: <dataset id>.<kind>[.<pid>.tmp]. The sweep leaves any
+# other file in the directory alone.
+SHARED_DATASET_FILE = re.compile(r'([0-9a-f]{40})\.(arrow|arrays|layout)(\.\d+\.tmp)?')
+
+_dataset_store = OrderedDict()
+_dataset_store_bytes = 0
+_dataset_store_lock = threading.Lock()
+# Futures of the datasets being parsed or attached, by key
+_dataset_loads = {}
+
+
+def process_alive(pid):
+    # Whether a worker process on this machine is still running
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# Hot-path instrumentation: wall time of every callback and of the stages inside it, request and
+# response bytes of every callback, and (with METRICS_TRACE_MEMORY) the peak traced allocation.
+# The last METRICS_WINDOW samples of each series are summarised at /metrics and in the debug panel.
+# Tracing allocations slows every callback down, and with concurrent requests the peaks overlap,
+# so it is off unless GAMES_DASHBOARD_TRACE_MEMORY is set (to anything but 0).
+METRICS_WINDOW = 1000
+METRICS_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+METRICS_TRACE_MEMORY = os.environ.get('GAMES_DASHBOARD_TRACE_MEMORY', '') not in ('', '0')
+
+# Multi-process serving: samples and aggregate cache counters are per worker, so every worker also writes
+# its own to METRICS_DIR/<pid>.json, at most every METRICS_FLUSH_SECONDS, after the requests it serves.
+# /metrics, /aggregate-cache and the debug panel merge the files of the other live workers with the
+# current values of the worker answering.
+METRICS_DIR = os.path.join(SHARED_DATASET_DIR, 'metrics') if SHARED_DATASET_DIR else None
+METRICS_FLUSH_SECONDS = 5
+if METRICS_DIR:
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+_metrics_flush_lock = threading.Lock()
+_metrics_flushed = {'time': 0.0}
+# Callback running in this thread; stages outside a callback are recorded under 'app'
+_metrics_context = threading.local()
+
+
+def record_metric(callback, series, value):
+    with _metrics_lock:
+        if (callback, series) not in _metrics:
+            _metrics[(callback, series)] = deque(maxlen=METRICS_WINDOW)
+        _metrics[(callback, series)].append(value)
+
+
+@contextmanager
+def timed_stage(stage):
+    # Records the wall time of the block as '<stage>_ms' of the running callback
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        callback = getattr(_metrics_context, 'callback', None) or 'app'
+        record_metric(callback, f'{stage}_ms', (time.perf_counter() - start) * 1000)
+
+
+def instrumented(function):
+    # Callback decorator, placed under @app.callback
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        _metrics_context.callback = _metrics_context.request_callback = function.__name__
+        if METRICS_TRACE_MEMORY:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        try:
+            with timed_stage('total'):
+                return function(*args, **kwargs)
+        finally:
+            if METRICS_TRACE_MEMORY:
+                record_metric(function.__name__, 'peak_alloc_kb', tracemalloc.get_traced_memory()[1] / 1024)
+            _metrics_context.callback = None
+
+    return wrapper
+
+
+@app.server.before_request
+def start_request_metrics():
+    _metrics_context.request_callback = None
+    flask.g.metrics_start = time.perf_counter()
+
+
+@app.server.after_request
+def record_request_metrics(response):
+    # Whole callback request: the callback plus Dash's JSON encoding of the figures it returned
+    callback = getattr(_metrics_context, 'request_callback', None)
+    if callback is not None and 'metrics_start' in flask.g:
+        record_metric(callback, 'request_ms', (time.perf_counter() - flask.g.metrics_start) * 1000)
+        record_metric(callback, 'bytes_in', flask.request.content_length or 0)
+        if not response.direct_passthrough:
+            record_metric(callback, 'bytes_out', len(response.get_data()))
+    if METRICS_DIR:
+        flush_worker_metrics()
+    return response
+
+
+def worker_metrics():
+    # This worker's samples, as [callback, series, values] lists, and aggregate cache counters
+    with _metrics_lock:
+        samples = [[callback, series, list(values)] for (callback, series), values in _metrics.items()]
+    with _aggregate_cache_lock:
+        aggregate_cache = dict(aggregate_cache_stats, entries=len(_aggregate_cache))
+    return {'samples': samples, 'aggregate_cache': aggregate_cache}
+
+
+def flush_worker_metrics():
+    # Skipped while another request thread of this worker is flushing
+    if not _metrics_flush_lock.acquire(blocking=False):
+        return
+    try:
+        if time.monotonic() < _metrics_flushed['time'] + METRICS_FLUSH_SECONDS:
+            return
+        _metrics_flushed['time'] = time.monotonic()
+        # Written under a temporary name and renamed, so other workers never read a partial file
+        path = os.path.join(METRICS_DIR, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as file:
+            json.dump(worker_metrics(), file)
+        os.replace(path + '.tmp', path)
+    finally:
+        _metrics_flush_lock.release()
+
+
+def all_worker_metrics():
+    # worker_metrics() of this worker and the last flushed ones of the other live workers.
+    # Files left by workers that exited are deleted.
+    workers = [worker_metrics()]
+    if not METRICS_DIR:
+        return workers
+    for name in os.listdir(METRICS_DIR):
+        pid, _, extension = name.partition('.')
+        if extension != 'json' or not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        path = os.path.join(METRICS_DIR, name)
+        if not process_alive(int(pid)):
+            with suppress(FileNotFoundError):
+                os.remove(path)
+            continue
+        with suppress(FileNotFoundError, ValueError), open(path) as file:
+            workers.append(json.load(file))
+    return workers
+
+
+def summarize_metric(series, samples):
+    values = np.fromiter(samples, dtype=np.float64)
+    summary = {
+        'count': len(values),
+        'mean': float(values.mean()),
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max()),
+    }
+    if series.endswith('_ms'):
+        # Samples per bucket, keyed by the bucket's upper bound in ms
+        counts = np.bincount(np.searchsorted(METRICS_BUCKETS_MS, values), minlength=len(METRICS_BUCKETS_MS) + 1)
+        summary['histogram'] = dict(zip([str(bound) for bound in METRICS_BUCKETS_MS] + ['inf'], counts.tolist()))
+    return summary
+
+
+def metrics_snapshot():
+    # {callback: {series: summary}} over the samples of all workers
+    samples = {}
+    for worker in all_worker_metrics():
+        for callback, series, values in worker['samples']:
+            samples.setdefault((callback, series), []).extend(values)
+
+    snapshot = {}
+    for (callback, series), values in sorted(samples.items()):
+        snapshot.setdefault(callback, {})[series] = summarize_metric(series, values)
+    return snapshot
+
+
+@app.server.route('/metrics')
+def metrics_info():
+    # Rolling per-callback and per-stage metrics, as JSON
+    return metrics_snapshot()
+
+
+def parse_contents(contents, filename=None):
+    # Decode the uploaded file and parse it with typed columns
+    with timed_stage('decode'):
+        content_type, content_string = contents.split(',')
+        decoded = base64.b64decode(content_string)
+    extension = (filename or '').lower().rsplit('.', 1)[-1]
+
+    with timed_stage('parse'):
+        if extension == 'parquet':
+            # Columnar output of 5202_CleanData.py, already typed
+            df = pd.read_parquet(io.BytesIO(decoded))
+        elif extension in ('feather', 'arrow'):
+            df = read_feather_buffer(decoded)
+        else:
+            df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
+
+    if not pd.api.types.is_datetime64_dtype(df['date']):
+        with timed_stage('to_datetime'):
+            df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    return df
+
+
+def read_feather_buffer(data):
+    # Arrow IPC / Feather file read straight from the decoded bytes (zero-copy when uncompressed)
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    return feather.read_table(pa.BufferReader(data)).to_pandas()
+
+
+def build_dataset(df):
+    # Stable sort keeps file order within a day; the original row labels are kept for file-order lookups.
+    # Rows without a date sort to the end and are never part of a date range.
+    df = compact_table(df).sort_values('date', kind='mergesort')
+    descriptions = pack_strings(df['description'])
+    df = df.drop(columns='description')
+
+    dataset = {
+        'df': df,
+        'dates': dated_rows(df),
+        'descriptions': descriptions,
+        'genre_bridge': build_bridge(df['genre']),
+        'platform_bridge': build_bridge(df['platform']),
+        'name_index': build_name_index(df['name']),
+    }
+    dataset['rollup'] = build_rollup(dataset)
+    dataset['distinct'] = build_distinct(dataset)
+    dataset['top_games'] = {'plays': build_top_index(dataset, 'plays')}
+    dataset['developers'] = build_developer_categories(df['developer'])
+    return dataset
+
+
+def dated_rows(df):
+    # Release dates of the dated rows, a view of the sorted 'date' column
+    dates = df['date'].to_numpy()
+    return dates[:int(df['date'].notna().sum())]
+
+
+LABEL_COLUMNS = ('genre', 'developer', 'platform')
+
+
+def compact_table(df):
+    # Narrowest dtypes that hold the values exactly
+    for column in LABEL_COLUMNS:
+        df[column] = df[column].astype('category')
+
+    try:
+        import pyarrow  # noqa: F401
+        df['name'] = df['name'].astype('string[pyarrow]')
+    except ImportError:
+        pass
+
+    for column in df.select_dtypes(np.integer).columns:
+        df[column] = pd.to_numeric(df[column], downcast='integer')
+    # Floats only become float32 when every value survives the round trip (ratings like 4.1 do not)
+    for column in df.select_dtypes(np.floating).columns:
+        values = df[column].to_numpy()
+        narrow = values.astype(np.float32)
+        if np.array_equal(narrow.astype(values.dtype), values, equal_nan=True):
+            df[column] = narrow
+    return df
+
+
+def pack_strings(column):
+    # One UTF-8 buffer plus offsets, without a Python string object per row
+    present = column.notna().to_numpy()
+    encoded = [str(value).encode('utf-8') if keep else b'' for value, keep in zip(column.to_numpy(dtype=object), present)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    return {'data': b''.join(encoded), 'offsets': offsets, 'present': present}
+
+
+def unpack_string(packed, position):
+    # String at a row position, None when it is missing
+    if not packed['present'][position]:
+        return None
+    return bytes(packed['data'][packed['offsets'][position]:packed['offsets'][position + 1]]).decode('utf-8')
+
+
+def build_name_index(names):
+    # Case-insensitive game name index: every distinct lowercased name once, sorted and packed into one
+    # UTF-8 buffer (see pack_strings), with the row position of its first game in file order.
+    # Exact search and type-ahead are binary searches over the packed keys, so the index holds no Python
+    # object per game; UTF-8 bytes sort like the strings they encode.
+    # Names are shown from the table's own 'name' column.
+    lower = names.str.lower()
+    valid = lower.notna().to_numpy()
+    order = np.argsort(names.index.to_numpy()[valid], kind='mergesort')
+    positions = np.flatnonzero(valid)[order]
+    keys = lower.to_numpy()[valid][order]
+
+    first = ~pd.Index(keys).duplicated()
+    positions, keys = positions[first], keys[first]
+
+    by_name = np.argsort(keys, kind='mergesort')
+    return {'keys': pack_strings(pd.Series(keys[by_name])), 'positions': positions[by_name].astype(np.int32)}
+
+
+def name_key(name_index, position):
+    # UTF-8 bytes of the key at a position of the sorted keys
+    keys = name_index['keys']
+    return bytes(keys['data'][keys['offsets'][position]:keys['offsets'][position + 1]])
+
+
+def name_search(name_index, key):
+    # Position of the first sorted key not below `key`
+    return bisect.bisect_left(range(len(name_index['positions'])), key, key=lambda position: name_key(name_index, position))
+
+
+def find_game(dataset, name):
+    # Row position of the first game in file order with this name (case-insensitive), or None
+    name_index = dataset['name_index']
+    key = name.lower().encode('utf-8')
+    position = name_search(name_index, key)
+    if position < len(name_index['positions']) and name_key(name_index, position) == key:
+        return int(name_index['positions'][position])
+    return None
+
+
+def name_prefix_matches(dataset, prefix, limit=10):
+    # Up to `limit` game names starting with `prefix` (case-insensitive), in alphabetical order
+    name_index = dataset['name_index']
+    prefix = prefix.lower().encode('utf-8')
+    lo = hi = name_search(name_index, prefix)
+    while hi < min(lo + limit, len(name_index['positions'])) and name_key(name_index, hi).startswith(prefix):
+        hi += 1
+    return dataset['df']['name'].iloc[name_index['positions'][lo:hi]].tolist()
+
+
+def build_bridge(column):
+    # Game<->label bridge table: one (row position, label code) pair per label of each game,
+    # ordered by row position. Games without labels keep a single pair with code -1.
+    labels = pd.Series(column.to_numpy(dtype=object), index=np.arange(len(column)))
+    labels = labels.str.split(',').explode().str.strip()
+    codes, categories = pd.factorize(labels, sort=True)
+
+    return {'rows': labels.index.to_numpy().astype(np.int32), 'codes': codes.astype(np.int32), 'categories': categories}
+
+
+# Rollup cube: the dated games pre-aggregated per calendar month (time bucket), built once per dataset.
+# 'cumulative' holds running totals of the measures over the months; 'genre' and 'platform' have one cell
+# per (month, label code) pair that occurs, ordered by month, with code -1 for games without labels.
+# A date range covers whole months plus part of a month at each end, like the partial years of
+# distinct_count: whole months come from the rollup, the rows of the partial months are aggregated
+# exactly, so aggregates cost the number of months in the range plus at most two months of games.
+CUMULATIVE_MEASURES = ('rows', 'games', 'plays_sum', 'plays_count', 'rating_sum', 'rating_count', 'descriptions', 'high_rating')
+# Measures of the label cubes besides the number of games
+LABEL_CUBE_MEASURES = {'genre': ('rating', 'reviews'), 'platform': ()}
+
+
+def build_rollup(dataset):
+    dates = dataset['dates']
+    buckets, starts, sizes = np.unique(dates.astype('datetime64[M]'), return_index=True, return_counts=True)
+    row_buckets = np.repeat(np.arange(len(buckets)), sizes)
+    totals = rollup_measures(dataset, 0, len(dates), row_buckets, len(buckets))
+
+    buckets = pd.DatetimeIndex(buckets.astype('datetime64[ns]'))
+    return {
+        # Month i covers the rows [starts[i], starts[i + 1])
+        'starts': np.append(starts, len(dates)),
+        'years': buckets.year.to_numpy(),
+        'months': buckets.month.to_numpy(),
+        # Running totals over the months, with a leading 0: the totals of months [i, j) are two lookups
+        'cumulative': {name: np.concatenate([[0], np.cumsum(totals[name])]) for name in CUMULATIVE_MEASURES},
+        'genre': build_label_cube(dataset, 'genre', 0, len(dates), row_buckets),
+        'platform': build_label_cube(dataset, 'platform', 0, len(dates), row_buckets),
+    }
+
+
+def rollup_sum(groups, values, size):
+    return np.bincount(groups, weights=values, minlength=size)
+
+
+def rollup_measure(groups, column, values, size):
+    # Sum and count of the non-missing values per group, so means can be re-aggregated
+    has_value = ~np.isnan(values)
+    return {f'{column}_sum': rollup_sum(groups, np.where(has_value, values, 0), size),
+            f'{column}_count': rollup_sum(groups, has_value, size).astype(np.int64)}
+
+
+def rollup_measures(dataset, lo, hi, groups, size):
+    # The CUMULATIVE_MEASURES of the rows [lo, hi) per group, groups[i] being the group of row lo + i
+    df = dataset['df']
+    values = {column: df[column].iloc[lo:hi].to_numpy(dtype='float64', na_value=np.nan) for column in ('plays', 'rating')}
+
+    totals = {'rows': np.bincount(groups, minlength=size), 'games': rollup_sum(groups, df['id'].iloc[lo:hi].notna().to_numpy(), size).astype(np.int64)}
+    for column, column_values in values.items():
+        totals.update(rollup_measure(groups, column, column_values, size))
+    totals['high_rating'] = rollup_sum(groups, values['rating'] > 3.5, size).astype(np.int64)
+    totals['descriptions'] = rollup_sum(groups, dataset['descriptions']['present'][lo:hi], size).astype(np.int64)
+    # Sums of integer columns stay integers, as in groupby().sum()
+    if pd.api.types.is_integer_dtype(df['plays']):
+        totals['plays_sum'] = totals['plays_sum'].astype(np.int64)
+    return totals
+
+
+def build_label_cube(dataset, label, lo, hi, row_buckets):
+    # Cells of the bridge pairs of the rows [lo, hi), row_buckets[i] being the month of row lo + i
+    bridge = dataset[f'{label}_bridge']
+    p_lo, p_hi = bridge['rows'].searchsorted(lo), bridge['rows'].searchsorted(hi)
+    rows, codes = bridge['rows'][p_lo:p_hi] - lo, bridge['codes'][p_lo:p_hi]
+    n_codes = len(bridge['categories']) + 1
+    cells, cell_of_pair = np.unique(row_buckets[rows].astype(np.int64) * n_codes + codes + 1, return_inverse=True)
+
+    cube = {'bucket': (cells // n_codes).astype(np.int32), 'code': (cells % n_codes - 1).astype(np.int32),
+            'games': np.bincount(cell_of_pair, minlength=len(cells)).astype(np.int32)}
+    for column in LABEL_CUBE_MEASURES[label]:
+        values = dataset['df'][column].iloc[lo:hi].to_numpy(dtype='float64', na_value=np.nan)[rows]
+        cube.update(rollup_measure(cell_of_pair, column, values, len(cells)))
+        cube[f'{column}_count'] = cube[f'{column}_count'].astype(np.int32)
+    return cube
+
+
+def rollup_range(dataset, lo, hi):
+    # Whole months [b_lo, b_hi) inside the rows [lo, hi), and the partial months at its ends
+    # as (row lo, row hi, month) triples
+    starts = dataset['rollup']['starts']
+    b_lo = int(starts.searchsorted(lo, side='left'))
+    b_hi = int(starts.searchsorted(hi, side='right')) - 1
+    if b_lo > b_hi:
+        # Inside one month
+        return b_lo, b_lo, [(lo, hi, b_hi)] if lo < hi else []
+    edges = [(lo, int(starts[b_lo]), b_lo - 1), (int(starts[b_hi]), hi, b_hi)]
+    return b_lo, b_hi, [edge for edge in edges if edge[0] < edge[1]]
+
+
+def partial_month_totals(dataset, row_lo, row_hi, bucket):
+    # The CUMULATIVE_MEASURES of the rows [row_lo, row_hi) of one month, as a single cell
+    totals = rollup_measures(dataset, row_lo, row_hi, np.zeros(row_hi - row_lo, dtype=np.intp), 1)
+    return dict(totals, bucket=np.array([bucket], dtype=np.int32))
+
+
+def rollup_cells(dataset, lo, hi):
+    # The CUMULATIVE_MEASURES of the rows [lo, hi) per month that has rows in it, with 'bucket' the month
+    b_lo, b_hi, edges = rollup_range(dataset, lo, hi)
+    whole = {name: np.diff(column[b_lo:b_hi + 1]) for name, column in dataset['rollup']['cumulative'].items()}
+    whole['bucket'] = np.arange(b_lo, b_hi, dtype=np.int32)
+    return merge_cells(whole, b_lo, [(bucket, partial_month_totals(dataset, row_lo, row_hi, bucket)) for row_lo, row_hi, bucket in edges])
+
+
+def label_cells(dataset, label, lo, hi):
+    # Cells of a label cube over the rows [lo, hi): the cube's cells of the whole months and
+    # cells aggregated from the bridge pairs of the partial months
+    cube = dataset['rollup'][label]
+    b_lo, b_hi, edges = rollup_range(dataset, lo, hi)
+    c_lo, c_hi = cube['bucket'].searchsorted(b_lo), cube['bucket'].searchsorted(b_hi)
+    whole = {name: column[c_lo:c_hi] for name, column in cube.items()}
+    return merge_cells(whole, b_lo, [(bucket, build_label_cube(dataset, label, row_lo, row_hi, np.full(row_hi - row_lo, bucket)))
+                                     for row_lo, row_hi, bucket in edges])
+
+
+def merge_cells(whole, b_lo, edges):
+    # Cells of the partial months, given as (month, cells) pairs, around the cells of the whole months, in month order
+    if not edges:
+        return whole
+    parts = [cells for bucket, cells in edges if bucket < b_lo] + [whole] + [cells for bucket, cells in edges if bucket >= b_lo]
+    return {name: np.concatenate([part[name] for part in parts]) for name in whole}
+
+
+def range_totals(dataset, lo, hi):
+    # Totals of the cumulative measures over the rows [lo, hi): two lookups for the whole months,
+    # plus the rows of the partial months
+    b_lo, b_hi, edges = rollup_range(dataset, lo, hi)
+    totals = {name: column[b_hi] - column[b_lo] for name, column in dataset['rollup']['cumulative'].items()}
+    for row_lo, row_hi, bucket in edges:
+        for name, value in partial_month_totals(dataset, row_lo, row_hi, bucket).items():
+            if name != 'bucket':
+                totals[name] = totals[name] + value[0]
+    return totals
+
+
+def range_mean(totals, column):
+    # Mean of the non-missing values, NaN when there are none, like Series.mean()
+    count = totals[f'{column}_count']
+    return totals[f'{column}_sum'] / count if count else np.nan
+
+
+def label_totals(bridge, cells, measure):
+    # Per-label total of a cube measure, like value_counts() / groupby().sum() after explode
+    valid = cells['code'] >= 0
+    return np.bincount(cells['code'][valid], weights=cells[measure][valid], minlength=len(bridge['categories']))
+
+
+# Distinct counts: 'genre' and 'developer' values are dictionary-encoded once per dataset and every
+# calendar year keeps a bitset of the codes that occur in it. A date range ORs the bitsets of the whole
+# years it covers and only scans the rows of the partial years at its two ends.
+# Missing values have code -1 and are not counted, like nunique().
+DISTINCT_COLUMNS = ('genre', 'developer')
+
+
+def build_distinct(dataset):
+    df, dates = dataset['df'], dataset['dates']
+    years, year_starts = np.unique(pd.DatetimeIndex(dates).year.to_numpy(), return_index=True)
+    # Year i covers the rows [starts[i], starts[i + 1])
+    starts = np.append(year_starts, len(dates))
+    row_years = np.repeat(np.arange(len(years)), np.diff(starts))
+
+    distinct = {'starts': starts}
+    for column in DISTINCT_COLUMNS:
+        codes, categories = pd.factorize(df[column].iloc[:len(dates)])
+        codes, size = codes.astype(np.int32), len(categories)
+
+        # One bit per (year, code) pair that occurs, in np.packbits order
+        valid = codes >= 0
+        pairs = np.unique(row_years[valid].astype(np.int64) * size + codes[valid])
+        bitsets = np.zeros((len(years), (size + 7) // 8), dtype=np.uint8)
+        np.bitwise_or.at(bitsets, (pairs // size, pairs % size // 8), (128 >> (pairs % size % 8)).astype(np.uint8))
+
+        distinct[column] = {'codes': codes, 'size': size, 'bitsets': bitsets}
+    return distinct
+
+
+def distinct_count(dataset, column, lo, hi):
+    # Number of distinct non-missing values of a column in the rows [lo, hi)
+    distinct = dataset['distinct']
+    starts, encoded = distinct['starts'], distinct[column]
+    codes = encoded['codes']
+
+    # Whole years [y_lo, y_hi) inside the rows [lo, hi)
+    y_lo = int(starts.searchsorted(lo, side='left'))
+    y_hi = int(starts.searchsorted(hi, side='right')) - 1
+
+    if y_lo >= y_hi:
+        # Less than a whole year: exact count over the rows
+        range_codes = codes[lo:hi]
+        return len(np.unique(range_codes[range_codes >= 0]))
+
+    seen = np.unpackbits(np.bitwise_or.reduce(encoded['bitsets'][y_lo:y_hi], axis=0), count=encoded['size']).astype(bool)
+    edge_codes = np.concatenate([codes[lo:starts[y_lo]], codes[starts[y_hi]:hi]])
+    seen[edge_codes[edge_codes >= 0]] = True
+    return int(seen.sum())
+
+
+# Top games per genre: for every genre code, the row positions of its TOP_GAMES_INDEX_SIZE best games
+# by a numeric column, best first with ties in file order. Games match a genre exactly through the
+# genre bridge table. The 'plays' index is built at load time, other columns the first time they are asked for
+# (then counted in the dataset's store size like the rest of it).
+TOP_GAMES_INDEX_SIZE = 10
+
+
+def build_top_index(dataset, column):
+    df, bridge = dataset['df'], dataset['genre_bridge']
+    values = df[column].to_numpy(dtype='float64', na_value=np.nan)[bridge['rows']]
+    keep = (bridge['codes'] >= 0) & ~np.isnan(values)
+    rows, codes, values = bridge['rows'][keep], bridge['codes'][keep], values[keep]
+
+    order = np.lexsort((df.index.to_numpy()[rows], -values, codes))
+    rows, codes = rows[order], codes[order]
+    # A genre listed twice for the same game counts once
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (rows[1:] != rows[:-1]) | (codes[1:] != codes[:-1])
+    rows, codes = rows[first], codes[first]
+
+    # Rank of each game within its genre
+    starts = codes.searchsorted(np.arange(len(bridge['categories']) + 1))
+    top = np.arange(len(codes)) - starts[codes] < TOP_GAMES_INDEX_SIZE
+    sizes = np.minimum(np.diff(starts), TOP_GAMES_INDEX_SIZE)
+    return {'rows': rows[top], 'offsets': np.concatenate([[0], np.cumsum(sizes)])}
+
+
+def top_games_by_genre(dataset, genre, column='plays', n=5):
+    # The n (at most TOP_GAMES_INDEX_SIZE) games of a genre with the largest values of a column
+    index = dataset['top_games'].get(column)
+    if index is None:
+        index = add_dataset_index(dataset, 'top_games', column, build_top_index(dataset, column))
+
+    code = dataset['genre_bridge']['categories'].get_indexer([genre])[0]
+    if code < 0:
+        return dataset['df'].iloc[[]]
+    start = index['offsets'][code]
+    return dataset['df'].iloc[index['rows'][start:min(start + n, index['offsets'][code + 1])]]
+
+
+# Developer categories of a dataset: one entry per distinct developer, in the order of the categories of
+# the 'developer' column, so a game's developer code is its categorical code. Developers are classified
+# by the cleaning script's DEVELOPER_CATEGORY_RULES (5202_CleanData.py), the one list of rules, so the
+# dashboard and cleaned_developers.csv always agree.
+def load_cleaning_module():
+    # The script name starts with a digit, so it is loaded from its file path
+    spec = importlib.util.spec_from_file_location('games_clean_data', os.path.join(os.path.dirname(os.path.abspath(__file__)), '5202_CleanData.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+cleaning = load_cleaning_module()
+
+
+def build_developer_categories(developers):
+    # Classification runs once per distinct developer
+    category = cleaning.classify_developers(pd.Series(developers.cat.categories, dtype=object))
+
+    # Code -1 (no developer) picks the last entry
+    return {'codes': developers.cat.codes.to_numpy(), 'category': np.append(category.to_numpy(), cleaning.DEVELOPER_DEFAULT_CATEGORY)}
+
+
+def developer_categories(dataset, lo, hi):
+    # Category of each game in the rows [lo, hi)
+    developers = dataset['developers']
+    return developers['category'][developers['codes'][lo:hi]]
+
+
+def dataset_nbytes(dataset):
+    # Memory held by a dataset: the table plus everything built from it, every buffer counted once.
+    # Views of the table's columns (like 'dates') are part of the table, and buffers inside the memory-mapped
+    # files of an attached dataset (its 'mapped' address ranges) are not counted, since all workers share
+    # them through the page cache.
+    df, mapped, seen = dataset['df'], dataset.get('mapped', ()), set()
+    size = object_nbytes(df.index.to_numpy(), seen, mapped)
+    for _, column in df.items():
+        size += column_nbytes(column, seen, mapped)
+    return size + sum(object_nbytes(value, seen, mapped) for name, value in dataset.items() if name not in ('df', 'mapped'))
+
+
+def column_nbytes(column, seen, mapped):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return object_nbytes(column.cat.codes.to_numpy(), seen, mapped) + object_nbytes(column.cat.categories, seen, mapped)
+    if isinstance(column.dtype, np.dtype) and column.dtype != object:
+        return object_nbytes(column.to_numpy(), seen, mapped)
+    if isinstance(column.dtype, pd.StringDtype) and column.dtype.storage == 'pyarrow':
+        # The Arrow chunks behind the column, without a copy
+        buffers = [buffer for chunk in column.array.__arrow_array__().chunks for buffer in chunk.buffers() if buffer is not None]
+        return sum(buffer.size for buffer in buffers if not is_mapped(buffer.address, mapped))
+    return int(column.memory_usage(deep=True, index=False))
+
+
+def is_mapped(address, mapped):
+    return any(start <= address < end for start, end in mapped)
+
+
+def array_root(array):
+    # The array that owns the memory of a view
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+def object_nbytes(value, seen, mapped=()):
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(object_nbytes(item, seen, mapped) for item in value.values())
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(object_nbytes(item, seen, mapped) for item in value)
+    if isinstance(value, np.ndarray):
+        root = array_root(value)
+        if id(root) in seen:
+            return 0
+        seen.add(id(root))
+        if root.dtype == object:
+            return root.nbytes + sum(sys.getsizeof(item) for item in root.ravel())
+        return 0 if is_mapped(root.__array_interface__['data'][0], mapped) else root.nbytes
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, bytes):
+        return len(value)
+    return sys.getsizeof(value)
+
+
+def date_range_positions(dataset, start_date, end_date):
+    # Row positions [lo, hi) of the games released between start_date and end_date (both inclusive)
+    dates = dataset['dates']
+    lo = 0 if start_date is None else int(dates.searchsorted(pd.Timestamp(start_date).to_datetime64().astype(dates.dtype), side='left'))
+    hi = len(dates) if end_date is None else int(dates.searchsorted(pd.Timestamp(end_date).to_datetime64().astype(dates.dtype), side='right'))
+    return lo, max(lo, hi)
+
+
+def shared_dataset_paths(key):
+    base = os.path.join(SHARED_DATASET_DIR, key)
+    return {'table': base + '.arrow', 'arrays': base + '.arrays', 'layout': base + '.layout'}
+
+
+# Arrays in the .arrays file start on multiples of this many bytes
+SHARED_ARRAY_ALIGNMENT = 64
+
+
+def shared_layout(value, arrays):
+    # `value` with every numeric array (and bytes buffer) replaced by an (offset, dtype, shape) tuple,
+    # the arrays being appended to `arrays` as (offset, array); datasets hold no other tuples
+    if isinstance(value, dict):
+        return {name: shared_layout(item, arrays) for name, item in value.items()}
+    if isinstance(value, bytes):
+        value = np.frombuffer(value, dtype=np.uint8)
+    if not isinstance(value, np.ndarray) or value.dtype == object:
+        return value
+    offset = 0
+    if arrays:
+        last_offset, last = arrays[-1]
+        offset = -(-(last_offset + last.nbytes) // SHARED_ARRAY_ALIGNMENT) * SHARED_ARRAY_ALIGNMENT
+    arrays.append((offset, np.ascontiguousarray(value)))
+    return (offset, value.dtype.str, value.shape)
+
+
+def mapped_layout(value, buffer):
+    # shared_layout() undone over the memory-mapped .arrays file
+    if isinstance(value, dict):
+        return {name: mapped_layout(item, buffer) for name, item in value.items()}
+    if isinstance(value, tuple):
+        offset, dtype, shape = value
+        dtype = np.dtype(dtype)
+        return buffer[offset:offset + dtype.itemsize * int(np.prod(shape))].view(dtype).reshape(shape)
+    return value
+
+
+def publish_dataset(key, dataset):
+    # Written under temporary names and renamed, the table last, so workers never see a partial dataset
+    import pyarrow as pa
+
+    paths = shared_dataset_paths(key)
+    if os.path.exists(paths['table']):
+        return
+
+    # 'dates' is a view of the table, taken again on attach
+    arrays = []
+    layout = shared_layout({name: value for name, value in dataset.items() if name not in ('df', 'dates')}, arrays)
+    temporary = {name: f'{path}.{os.getpid()}.tmp' for name, path in paths.items()}
+    with open(temporary['arrays'], 'wb') as file:
+        for offset, array in arrays:
+            file.seek(offset)
+            file.write(array.data)
+    with open(temporary['layout'], 'wb') as file:
+        pickle.dump(layout, file, protocol=pickle.HIGHEST_PROTOCOL)
+    table = pa.Table.from_pandas(dataset['df'], preserve_index=True)
+    with pa.OSFile(temporary['table'], 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    for name in ('arrays', 'layout', 'table'):
+        os.replace(temporary[name], paths[name])
+
+
+def sweep_shared_datasets():
+    # Called after publishing; the newest dataset is always kept
+    now = time.time()
+    datasets = {}
+    for entry in os.scandir(SHARED_DATASET_DIR):
+        match = SHARED_DATASET_FILE.fullmatch(entry.name)
+        if match is None or not entry.is_file():
+            continue
+        stat = entry.stat()
+        key, extension, temporary = match.groups()
+        if temporary:
+            if now - stat.st_mtime > SHARED_TEMPORARY_MAX_AGE:
+                with suppress(FileNotFoundError):
+                    os.remove(entry.path)
+            continue
+        size, used = datasets.get(key, (0, 0))
+        datasets[key] = (size + stat.st_size, stat.st_mtime if extension == 'arrow' else used)
+
+    total = sum(size for size, _ in datasets.values())
+    for key, (size, _) in sorted(datasets.items(), key=lambda item: item[1][1])[:-1]:
+        if total <= SHARED_DATASET_MAX_BYTES:
+            break
+        # The table goes first, so other workers stop attaching the dataset
+        for path in sorted(shared_dataset_paths(key).values(), key=lambda path: not path.endswith('.arrow')):
+            with suppress(FileNotFoundError):
+                os.remove(path)
+        total -= size
+
+
+def touch_shared_dataset(key):
+    # Marks a published dataset as used, for the sweep
+    with suppress(FileNotFoundError):
+        os.utime(shared_dataset_paths(key)['table'])
+
+
+def attach_dataset(key):
+    # Dataset published by another worker, or None. The table's columns and every index stay memory-mapped.
+    import pyarrow as pa
+
+    # Dataset ids come from the browser and become file names
+    if len(key) != 40 or not all(character in '0123456789abcdef' for character in key):
+        return None
+    paths = shared_dataset_paths(key)
+    try:
+        source = pa.memory_map(paths['table'])
+        buffer = np.memmap(paths['arrays'], dtype=np.uint8, mode='r')
+        with open(paths['layout'], 'rb') as file:
+            layout = pickle.load(file)
+    except FileNotFoundError:
+        # Not published, or swept
+        return None
+
+    region = source.read_buffer()
+    table = pa.ipc.open_file(source).read_all()
+    df = table.to_pandas(split_blocks=True, types_mapper={pa.string(): pd.StringDtype('pyarrow'),
+                                                          pa.large_string(): pd.StringDtype('pyarrow')}.get)
+    buffer_address = buffer.__array_interface__['data'][0]
+    return {
+        'df': df,
+        'dates': dated_rows(df),
+        **mapped_layout(layout, buffer),
+        # Address ranges of the memory-mapped files, for dataset_nbytes
+        'mapped': [(region.address, region.address + region.size), (buffer_address, buffer_address + len(buffer))],
+    }
+
+
+def store_dataset(key, dataset, size):
+    # Called with the store lock held
+    global _dataset_store_bytes
+
+    _dataset_store[key] = (dataset, size)
+    _dataset_store_bytes += size
+    evict_datasets()
+
+
+def evict_datasets():
+    # Called with the store lock held. Evicts the least recently used datasets, always keeping the newest one
+    global _dataset_store_bytes
+
+    while _dataset_store_bytes > DATASET_STORE_MAX_BYTES and len(_dataset_store) > 1:
+        _, (_, evicted_size) = _dataset_store.popitem(last=False)
+        _dataset_store_bytes -= evicted_size
+
+
+def add_dataset_index(dataset, group, name, index):
+    # Adds an index built after load time to dataset[group] and grows the dataset's store size by it.
+    # The index is built outside the store lock, so when two callbacks built it at once the first one added is kept.
+    global _dataset_store_bytes
+
+    with _dataset_store_lock:
+        indexes = dataset[group]
+        if name in indexes:
+            return indexes[name]
+        indexes[name] = index
+        # An evicted dataset is only held by the callbacks still using it, and is not counted anymore
+        key = next((key for key, (stored, _) in _dataset_store.items() if stored is dataset), None)
+        if key is not None:
+            stored, size = _dataset_store[key]
+            extra = object_nbytes(index, set())
+            _dataset_store[key] = (stored, size + extra)
+            _dataset_store_bytes += extra
+            evict_datasets()
+    return index
+
+
+def load_dataset(key, load):
+    # Dataset of a key from the store, or loaded by load() (None when it cannot be loaded).
+    # The store lock only guards the store itself: loading runs outside it, so other users' callbacks
+    # are never held up by an upload, and concurrent requests for the same key wait for one load.
+    with _dataset_store_lock:
+        if key in _dataset_store:
+            _dataset_store.move_to_end(key)
+            return _dataset_store[key][0]
+        future = _dataset_loads.get(key)
+        loading = future is None
+        if loading:
+            future = _dataset_loads[key] = Future()
+
+    if not loading:
+        return future.result()
+
+    try:
+        dataset = load()
+        if dataset is not None:
+            size = dataset_nbytes(dataset)
+            with _dataset_store_lock:
+                store_dataset(key, dataset, size)
+        future.set_result(dataset)
+        return dataset
+    except BaseException as error:
+        future.set_exception(error)
+        raise
+    finally:
+        with _dataset_store_lock:
+            del _dataset_loads[key]
+
+
+def register_dataset(contents, filename=None):
+    key = hashlib.sha1(contents.encode('utf-8')).hexdigest()
+
+    def load():
+        df = parse_contents(contents, filename)
+        with timed_stage('build_dataset'):
+            dataset = build_dataset(df)
+        if SHARED_DATASET_DIR:
+            with timed_stage('publish_dataset'):
+                publish_dataset(key, dataset)
+                sweep_shared_datasets()
+        return dataset
+
+    load_dataset(key, load)
+    return key
+
+
+def get_dataset(dataset_id):
+    # Returns None when nothing was uploaded or the dataset has been evicted
+    if dataset_id is None:
+        return None
+
+    def load():
+        # Uploaded through another worker, or evicted here
+        if not SHARED_DATASET_DIR:
+            return None
+        with timed_stage('attach_dataset'):
+            return attach_dataset(dataset_id)
+
+    dataset = load_dataset(dataset_id, load)
+    if dataset is not None and SHARED_DATASET_DIR:
+        touch_shared_dataset(dataset_id)
+    return dataset
+
+
+# Aggregates behind the charts. Each one takes a dataset and the row positions [lo, hi) of a date range
+# and reduces over the rollup cube cells of that range.
+# Results are memoized per (dataset id, date range, aggregate name) in a bounded LRU cache and shared
+# between callbacks and users, so callbacks must not modify the returned frames.
+
+def aggregate_period_stats(dataset, lo, hi, period):
+    cells = rollup_cells(dataset, lo, hi)
+    key = pd.Series(dataset['rollup'][period + 's'][cells['bucket']], name=period)
+    sums = pd.DataFrame({'Num_Games': cells['games'], 'Total_Plays': cells['plays_sum'],
+                         'rating_sum': cells['rating_sum'], 'rating_count': cells['rating_count']}).groupby(key).sum()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sums['Avg_Rating'] = sums['rating_sum'].to_numpy() / sums['rating_count'].to_numpy()
+    return sums[['Num_Games', 'Total_Plays', 'Avg_Rating']].reset_index()
+
+
+def aggregate_genre_per_year(dataset, lo, hi):
+    # Number of distinct genres per year, years whose games have no genre count 0
+    cells = label_cells(dataset, 'genre', lo, hi)
+    n_genres = len(dataset['genre_bridge']['categories'])
+    cell_years = dataset['rollup']['years'][cells['bucket']].astype(np.int64)
+    valid = cells['code'] >= 0
+    year_genre_pairs = np.unique(cell_years[valid] * n_genres + cells['code'][valid])
+    all_years = np.unique(cell_years)
+    unique_genres = pd.Series(year_genre_pairs // n_genres).value_counts().reindex(all_years, fill_value=0)
+    return pd.DataFrame({'year': all_years, 'Unique_Genres': unique_genres.to_numpy()})
+
+
+def aggregate_genre_stats(dataset, lo, hi):
+    # Number of games, average rating and average reviews per genre, in genre order,
+    # from the cells of the genre cube
+    genre_bridge = dataset['genre_bridge']
+    cells = label_cells(dataset, 'genre', lo, hi)
+    counts = label_totals(genre_bridge, cells, 'games').astype(np.int64)
+    present = counts > 0
+
+    genre_stats = {'genre': genre_bridge['categories'][present], 'count': counts[present]}
+    for column in ('rating', 'reviews'):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = label_totals(genre_bridge, cells, f'{column}_sum') / label_totals(genre_bridge, cells, f'{column}_count')
+        genre_stats[f'average_{column}'] = means[present]
+    return pd.DataFrame(genre_stats)
+
+
+def genre_counts_by_count(genre_stats):
+    # Number of games per genre, most common first
+    return genre_stats[['genre', 'count']].sort_values('count', ascending=False, kind='mergesort')
+
+
+def aggregate_platform_counts(dataset, lo, hi):
+    # Games per platform, with every platform other than Windows PC, Linux and Web browser
+    # (including missing platforms) counted as 'others'
+    platform_bridge = dataset['platform_bridge']
+    cells = label_cells(dataset, 'platform', lo, hi)
+    specified_platforms = ['Windows PC', 'Linux', 'Web browser']
+    labels = np.append(np.where(platform_bridge['categories'].isin(specified_platforms), platform_bridge['categories'], 'others'), 'others')
+
+    # Code -1 (no platform) picks the last label, 'others'
+    platform_counts = pd.Series(cells['games'], index=labels[cells['code']]).groupby(level=0).sum()
+    platform_counts = platform_counts[platform_counts > 0].sort_values(ascending=False, kind='mergesort').reset_index()
+    platform_counts.columns = ['platform', 'count']
+    return platform_counts
+
+
+AGGREGATES = {
+    'yearly_stats': lambda dataset, lo, hi: aggregate_period_stats(dataset, lo, hi, 'year'),
+    'monthly_stats': lambda dataset, lo, hi: aggregate_period_stats(dataset, lo, hi, 'month'),
+    'genre_per_year': aggregate_genre_per_year,
+    'genre_stats': aggregate_genre_stats,
+    'platform_counts': aggregate_platform_counts,
+}
+
+AGGREGATE_CACHE_SIZE = 512
+
+_aggregate_cache = OrderedDict()
+_aggregate_cache_lock = threading.Lock()
+aggregate_cache_stats = {'hits': 0, 'misses': 0}
+
+
+def get_aggregate(dataset_id, dataset, start_date, end_date, name):
+    # Ranges that select the same rows share a cache entry
+    lo, hi = date_range_positions(dataset, start_date, end_date)
+    key = (dataset_id, lo, hi, name)
+
+    with _aggregate_cache_lock:
+        if key in _aggregate_cache:
+            aggregate_cache_stats['hits'] += 1
+            _aggregate_cache.move_to_end(key)
+            return _aggregate_cache[key]
+        aggregate_cache_stats['misses'] += 1
+
+    with timed_stage(f'aggregate_{name}'):
+        result = AGGREGATES[name](dataset, lo, hi)
+
+    with _aggregate_cache_lock:
+        _aggregate_cache[key] = result
+        while len(_aggregate_cache) > AGGREGATE_CACHE_SIZE:
+            _aggregate_cache.popitem(last=False)
+
+    return result
+
+
+@app.server.route('/aggregate-cache')
+def aggregate_cache_info():
+    # Hit/miss counters and entries of the aggregate caches of all workers, as JSON; max_entries is per worker
+    workers = [worker['aggregate_cache'] for worker in all_worker_metrics()]
+    totals = {name: sum(worker[name] for worker in workers) for name in ('hits', 'misses', 'entries')}
+    return dict(totals, workers=len(workers), max_entries=AGGREGATE_CACHE_SIZE)
+
+
+# Background jobs: the Overview and Feedback tab computations run on a thread pool instead of the
+# request thread. The tab callback submits a job and returns; the tab's dcc.Interval then polls the
+# job and shows its progress until the result can be drawn. Browsers asking for the same computation
+# share one job, and a job nobody waits for any more (its inputs changed) is cancelled at its next
+# progress step. Polls never compute anything themselves.
+# Job state (waiters, progress) and results are files in BACKGROUND_JOB_DIR, read and written under a
+# file lock. Under 5202_Serve.py that directory is next to the shared datasets, so a poll answered by
+# any worker sees the job that another worker is running; a single process uses a private directory.
+BACKGROUND_WORKERS = 4
+BACKGROUND_POLL_MS = 300
+# Jobs that finish within this time are drawn by the request that submitted them, without polling
+BACKGROUND_INLINE_SECONDS = 0.2
+# Results nobody collected (the browser went away) are dropped after this many seconds
+BACKGROUND_RESULT_TTL = 60
+# Failed jobs stay failed for BACKGROUND_RESULT_TTL too: asking again within that time shows the same error
+if SHARED_DATASET_DIR:
+    BACKGROUND_JOB_DIR = os.path.join(SHARED_DATASET_DIR, 'jobs')
+    os.makedirs(BACKGROUND_JOB_DIR, exist_ok=True)
+else:
+    # Private to this process, deleted when it exits
+    BACKGROUND_JOB_DIR = tempfile.mkdtemp(prefix='games-dashboard-jobs-')
+    atexit.register(shutil.rmtree, BACKGROUND_JOB_DIR, ignore_errors=True)
+
+_jobs_lock = threading.Lock()
+_job_executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix='dashboard-job')
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobFailed(Exception):
+    pass
+
+
+@contextmanager
+def locked_jobs():
+    # Threads of this process queue on the thread lock, worker processes on the file lock
+    with _jobs_lock, open(os.path.join(BACKGROUND_JOB_DIR, '.lock'), 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def job_paths(key):
+    # State and result files of a job key (the computation and its JSON arguments)
+    base = os.path.join(BACKGROUND_JOB_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest())
+    return base + '.json', base + '.pickle'
+
+
+def read_job(key):
+    # Called with the jobs locked; None when there is no such job
+    try:
+        with open(job_paths(key)[0]) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_job(key, job):
+    state_path = job_paths(key)[0]
+    with open(state_path + '.tmp', 'w') as file:
+        json.dump(job, file)
+    os.replace(state_path + '.tmp', state_path)
+
+
+def delete_job_files(base):
+    for path in (base + '.json', base + '.pickle'):
+        with suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def sweep_jobs():
+    # Called with the jobs locked: drops finished jobs nobody collected and jobs whose worker process is gone
+    now = time.time()
+    for entry in os.scandir(BACKGROUND_JOB_DIR):
+        if not entry.name.endswith('.json'):
+            continue
+        try:
+            with open(entry.path) as file:
+                job = json.load(file)
+        except (FileNotFoundError, ValueError):
+            continue
+        if (job['finished'] and now - job['finished'] > BACKGROUND_RESULT_TTL) or (not job['finished'] and not process_alive(job['owner'])):
+            delete_job_files(entry.path[:-len('.json')])
+
+
+def release_locked_job(key, job):
+    # One browser stopped waiting for the job; the last one removes it, which cancels it if it is still running
+    job['waiters'] -= 1
+    if job['waiters'] <= 0:
+        delete_job_files(job_paths(key)[0][:-len('.json')])
+    else:
+        write_job(key, job)
+
+
+def run_job(name, key, run, args):
+    # `run` tells this run apart from a later job with the same key, submitted after this one was cancelled
+    def current_job():
+        job = read_job(key)
+        if job is None or job['run'] != run:
+            raise JobCancelled
+        return job
+
+    def set_progress(done, total):
+        with locked_jobs():
+            job = current_job()
+            job['progress'] = [done, total]
+            write_job(key, job)
+
+    _metrics_context.callback = f'job_{name}'
+    try:
+        try:
+            result, error = JOBS[name](set_progress, *args), None
+        except JobCancelled:
+            return
+        except Exception:
+            result, error = None, traceback.format_exc()
+            print(f'Background job {name} failed:\n{error}', file=sys.stderr)
+
+        result_path = job_paths(key)[1]
+        with open(f'{result_path}.{run}.tmp', 'wb') as file:
+            pickle.dump(result, file)
+        with locked_jobs():
+            try:
+                job = current_job()
+            except JobCancelled:
+                os.remove(f'{result_path}.{run}.tmp')
+                return
+            os.replace(f'{result_path}.{run}.tmp', result_path)
+            job['finished'], job['error'] = time.time(), error
+            write_job(key, job)
+    finally:
+        _metrics_context.callback = None
+
+
+def submit_job(name, args):
+    # Key of the job computing JOBS[name](*args), new or already in flight in any worker
+    key = json.dumps([name, args])
+    with locked_jobs():
+        sweep_jobs()
+        job = read_job(key)
+        if job is None:
+            job = {'waiters': 0, 'progress': [0, 1], 'owner': os.getpid(), 'run': os.urandom(8).hex(), 'finished': None, 'error': None}
+            _job_executor.submit(run_job, name, key, job['run'], args)
+        job['waiters'] += 1
+        write_job(key, job)
+    return key
+
+
+def release_job(key):
+    with locked_jobs():
+        job = read_job(key)
+        if job is not None:
+            release_locked_job(key, job)
+
+
+def poll_job(key, wait=0):
+    # ('running', [done, total]), ('done', result), or ('missing', None) when the job was already
+    # collected, cancelled or dropped. Collecting the result releases the job. A failed job raises
+    # JobFailed with the last line of its traceback and is kept, so submitting it again fails at once.
+    deadline = time.monotonic() + wait
+    while True:
+        with locked_jobs():
+            job = read_job(key)
+            if job is None:
+                return 'missing', None
+            if job['error']:
+                job['waiters'] = 0
+                write_job(key, job)
+                raise JobFailed(job['error'].strip().splitlines()[-1])
+            if job['finished']:
+                with open(job_paths(key)[1], 'rb') as file:
+                    result = pickle.load(file)
+                release_locked_job(key, job)
+                return 'done', result
+        if time.monotonic() >= deadline:
+            return 'running', job['progress']
+        time.sleep(0.02)
 
 
 # Layout of the dashboard
@@ -48,7 +1290,9 @@ app.layout = html.Div(children=[
     html.Div(
         style={'display': 'flex', 'justifyContent': 'flex-end', 'marginRight': '10px'},
         children=[
-            dcc.Input(id='search-bar', type='text', placeholder='Search for a game...'),
+            dcc.Input(id='search-bar', type='text', placeholder='Search for a game...', list='search-suggestions'),
+            # Type-ahead suggestions from the name index
+            html.Datalist(id='search-suggestions'),
             html.Button(id='search-button', n_clicks=0, children='Search'),
         ]
     ),
@@ -67,6 +1311,20 @@ app.layout = html.Div(children=[
     # Store component for state management
     dcc.Store(id='store-searched-game', storage_type='session'),
 
+    # Id of the uploaded dataset in the server-side dataset store
+    dcc.Store(id='dataset-id'),
+
+    # (dataset id, start date, end date) each tab was last drawn for; tabs that differ are stale
+    dcc.Store(id='overview-rendered'),
+    dcc.Store(id='relationship-rendered'),
+    dcc.Store(id='feedback-rendered'),
+
+    # Background job each heavy tab is waiting for, polled by its interval while it runs
+    dcc.Store(id='overview-job'),
+    dcc.Store(id='feedback-job'),
+    dcc.Interval(id='overview-job-interval', interval=BACKGROUND_POLL_MS, disabled=True),
+    dcc.Interval(id='feedback-job-interval', interval=BACKGROUND_POLL_MS, disabled=True),
+
     # Text asks user to upload file
     html.Div(id='data-summary-text',
              style={'width': '100%'}),
@@ -80,9 +1338,10 @@ app.layout = html.Div(children=[
     ),
     
 
-    dcc.Tabs(id="tabs", children = [
+    dcc.Tabs(id="tabs", value='overview', children = [
         
-        dcc.Tab(label='Overview', children=[  
+        dcc.Tab(label='Overview', value='overview', children=[  
+            html.Div(id='overview-job-progress'),
             # Containers for the six metrics
             html.Div(id='metrics-container', style={'display': 'flex', 'justifyContent': 'space-around', 'flexWrap': 'wrap', 'gap': '20px'}, children=[
                 html.Div(children=[
@@ -125,14 +1384,15 @@ app.layout = html.Div(children=[
             html.Div(id='time-series-chart', style={'width': '100%', 'marginTop': '20px'}),
         ]),
 
-        dcc.Tab(label='Relationship', children=[
+        dcc.Tab(label='Relationship', value='relationship', children=[
             #新增relationship的表格
             html.Div(id='reviews-rating-chart', style={'width': '100%', 'marginTop': '20px'}),
             html.Div(id='plays-playing-chart', style={'width': '100%', 'marginTop': '20px'}),
             dcc.Graph(id='rating-comparison-chart'),
         ]),
 
-        dcc.Tab(label='Feedback', children=[
+        dcc.Tab(label='Feedback', value='feedback', children=[
+            html.Div(id='feedback-job-progress'),
             dcc.Graph(id='genre-distribution-chart'),
             html.Div(id='top-games-by-plays'),
             html.Div(id='genre-rating-chart', style={'width': '100%', 'marginTop': '20px'}),
@@ -143,9 +1403,73 @@ app.layout = html.Div(children=[
             
     ]),
 
+    # Debug panel with the rolling callback metrics served at /metrics
+    html.Details(style={'margin': '20px 0'}, children=[
+        html.Summary('Performance metrics'),
+        html.Button('Refresh', id='metrics-refresh', n_clicks=0),
+        html.Div(id='metrics-panel'),
+    ]),
+
 ], style={'backgroundColor': '#ADD8E6'})
 
 
+# Charts are only computed for the visible tab. A hidden tab keeps its old charts and is redrawn
+# when it is opened, unless it was already drawn for the same dataset and date range.
+def tab_needs_render(tab, active_tab, rendered, render_key):
+    return tab == active_tab and rendered != render_key
+
+
+def background_job(name, args, needs_render, job):
+    # Submit/poll step of a background tab callback.
+    # Returns (job result or None, (job key, interval disabled, progress) outputs)
+    ticked = all(trigger['prop_id'].startswith(f'{name}-job-interval.') for trigger in callback_context.triggered)
+    if not ticked:
+        # New inputs supersede a job for other inputs
+        if job is not None and job != json.dumps([name, args]):
+            release_job(job)
+            job = None
+        if needs_render and job is None:
+            job = submit_job(name, args)
+    if job is None:
+        return None, (None, True, '')
+
+    try:
+        status, value = poll_job(job, wait=0 if ticked else BACKGROUND_INLINE_SECONDS)
+    except JobFailed as error:
+        # Polling stops; the same inputs are not computed again while the failure is kept
+        return None, (None, True, f'Computation failed: {error}')
+    if status == 'missing':
+        # Collected by an earlier poll, cancelled or dropped: computed again only if the tab still needs it
+        if not needs_render:
+            return None, (None, True, '')
+        job, status, value = submit_job(name, args), 'running', [0, 1]
+    if status == 'running':
+        done, total = value
+        return None, (job, False, html.Div([html.Progress(value=str(done), max=str(total)), f' Computing... {done}/{total}']))
+    return value, (None, True, '')
+
+
+def stop_background_job(job):
+    if job is not None:
+        release_job(job)
+    return None, True, ''
+
+
+# Callback to send the uploaded file to the server once and keep only its dataset id in the browser
+@app.callback(
+    [Output('dataset-id', 'data'),
+     Output('upload-data', 'contents')],  # Clear the file from the browser after it has been stored
+    [Input('upload-data', 'contents')],
+    [State('upload-data', 'filename')]    # The extension selects CSV, Parquet or Feather parsing
+)
+@instrumented
+def store_uploaded_dataset(contents, filename):
+    if contents is None:
+        raise PreventUpdate
+
+    return register_dataset(contents, filename), None
+
+
 # Callback to update the graph based on the uploaded file
 @app.callback(
     [Output('data-summary-text', 'children'),
@@ -155,41 +1479,65 @@ app.layout = html.Div(children=[
      Output('avg-plays', 'children'),
      Output('avg-rating', 'children'),
      Output('num-description', 'children'),
-     Output('time-series-chart', 'children')],  # 新增：输出用于显示时间序列图表
+     Output('time-series-chart', 'children'),  # 新增：输出用于显示时间序列图表
+     Output('overview-rendered', 'data'),
+     Output('overview-job', 'data'),
+     Output('overview-job-interval', 'disabled'),
+     Output('overview-job-progress', 'children')],
     
-    [Input('upload-data', 'contents'),
-     Input('upload-data', 'filename'),
+    [Input('dataset-id', 'data'),
      Input('date-picker-range', 'start_date'),
-     Input('date-picker-range', 'end_date')]
+     Input('date-picker-range', 'end_date'),
+     Input('tabs', 'value'),
+     Input('overview-job-interval', 'n_intervals')],
+    [State('overview-rendered', 'data'),
+     State('overview-job', 'data')]
 )
 
-def update_summary(content, filename, start_date, end_date):
+@instrumented
+def update_summary(dataset_id, start_date, end_date, active_tab, n_intervals, rendered, job):
 
     # Initial placeholders for the statistics
     num_games = num_genres = unique_developers = avg_plays = avg_rating = num_description = 'N/A'
     
     graphs = None  # 新增：默认值初始化 graphs
     
-    if content is None:
-        return 'Upload a file to see the summary.', num_games, num_genres, unique_developers, avg_plays, avg_rating, num_description, graphs  # 新增：graphs
+    # Parsed dataset shared through the dataset store
+    dataset = get_dataset(dataset_id)
 
-    # Decode the uploaded file
-    content_type, content_string = content.split(',')
-    decoded = io.StringIO(base64.b64decode(content_string).decode('utf-8'))
-    df = pd.read_csv(decoded)
+    if dataset is None:
+        return ('Upload a file to see the summary.', num_games, num_genres, unique_developers, avg_plays, avg_rating, num_description, graphs, None) + stop_background_job(job)  # 新增：graphs
     # Give a summary of the file
     summary_text = ''
 
+    # The summary text is outside the tabs; the Overview metrics and charts wait until the tab is visible
+    # and are computed by the 'overview' background job
+    render_key = [dataset_id, start_date, end_date]
+    result, job_outputs = background_job('overview', render_key, tab_needs_render('overview', active_tab, rendered, render_key), job)
+    if result is None:
+        return (summary_text,) + (dash.no_update,) * 8 + job_outputs
+    return (summary_text,) + result + job_outputs
+
+
+def compute_overview(set_progress, dataset_id, start_date, end_date):
+    # Metrics and charts of the Overview tab, with the render key they were drawn for
+    dataset = get_dataset(dataset_id)
+    if dataset is None:
+        return None
+    set_progress(0, 3)
+
     # Filter according to date selection
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    filtered_df = df[(df['date'] >= pd.to_datetime(start_date)) & (df['date'] <= pd.to_datetime(end_date))]
-    # Overview of data within the selected date range
-    num_games = len(filtered_df)
-    num_genres = filtered_df['genre'].nunique()
-    unique_developers = filtered_df['developer'].nunique()
-    avg_plays = round(filtered_df['plays'].mean(), 2)
-    avg_rating = round(filtered_df['rating'].mean(), 2)
-    num_description = filtered_df['description'].notna().sum()
+    lo, hi = date_range_positions(dataset, start_date, end_date)
+    # Overview of data within the selected date range, counts and means come from the running totals
+    # and distinct counts from the per-year bitsets
+    totals = range_totals(dataset, lo, hi)
+    num_games = int(totals['rows'])
+    num_genres = distinct_count(dataset, 'genre', lo, hi)
+    unique_developers = distinct_count(dataset, 'developer', lo, hi)
+    avg_plays = round(range_mean(totals, 'plays'), 2)
+    avg_rating = round(range_mean(totals, 'rating'), 2)
+    num_description = int(totals['descriptions'])
+    set_progress(1, 3)
 
 
 
@@ -200,15 +1548,9 @@ def update_summary(content, filename, start_date, end_date):
     start_year = pd.to_datetime(start_date).year
     end_year = pd.to_datetime(end_date).year
     
-    # Create a copy of the filtered DataFrame and add new columns
-    filtered_df = filtered_df.copy()
-    
-    filtered_df['year'] = filtered_df['date'].dt.year
-    filtered_df['month'] = filtered_df['date'].dt.month
-
     
     if start_year != end_year:  #Starting and ending dates and years are different, analyze by year
-        yearly_stats = filtered_df.groupby('year').agg(Num_Games=('id', 'count'), Total_Plays=('plays', 'sum'), Avg_Rating=('rating', 'mean')).reset_index()
+        yearly_stats = get_aggregate(dataset_id, dataset, start_date, end_date, 'yearly_stats')
         
         # Generate yearly statistical charts
         fig = px.line(yearly_stats, x='year', y='Num_Games', title='Number of Games Released Each Year', markers=True)
@@ -219,7 +1561,7 @@ def update_summary(content, filename, start_date, end_date):
         fig3.update_xaxes(type='category')
    
     else:  #Starting and ending date years are the same, analyzed monthly
-        monthly_stats = filtered_df.groupby('month').agg(Num_Games=('id', 'count'), Total_Plays=('plays', 'sum'), Avg_Rating=('rating', 'mean')).reset_index()
+        monthly_stats = get_aggregate(dataset_id, dataset, start_date, end_date, 'monthly_stats')
         
         # Generate monthly statistical charts
         fig = px.line(monthly_stats, x='month', y='Num_Games', title='Number of Games Released Each Month', markers=True)
@@ -230,30 +1572,20 @@ def update_summary(content, filename, start_date, end_date):
         fig3.update_xaxes(type='category')
 
 
-    # Analyzing genes requires splitting the 'gene' column and creating a new dataframe for splitting
-    genre_df = filtered_df
-    
-    # Split a string into a list & Remove excess spaces from each element in the list
-    genre_df['genre'] = genre_df['genre'].str.split(',')  
-    genre_df['genre'] = genre_df['genre'].apply(lambda x: [i.strip() for i in x] if isinstance(x, list) else x)  
-    
-    #Split each list item into a new row
-    genre_df = genre_df.explode('genre')  
-    
-    # Add year column for analysis
-    genre_df['year'] = genre_df['date'].dt.year
+    set_progress(2, 3)
+
+    # Analyzing genres uses the game<->genre bridge table built when the file was loaded
     
     if start_year != end_year:  # start and end dates and years are different
        # Group by year and calculate the number of unique game types for each year
-        genre_per_year = genre_df.groupby('year')['genre'].nunique().reset_index(name='Unique_Genres')
+        genre_per_year = get_aggregate(dataset_id, dataset, start_date, end_date, 'genre_per_year')
 
         fig4 = px.line(genre_per_year, x='year', y='Unique_Genres', title='Unique Game Genres Per Year', markers=True)
         fig4.update_xaxes(type='category')
 
     else: # one year
         # Calculate the number of games per 'genre'and descend order
-        genre_stats = genre_df.groupby(['genre']).size().reset_index(name='Num_Games')
-        genre_stats = genre_stats.sort_values(by='Num_Games', ascending=False)
+        genre_stats = genre_counts_by_count(get_aggregate(dataset_id, dataset, start_date, end_date, 'genre_stats')).rename(columns={'count': 'Num_Games'})
         
         fig4 = px.bar(genre_stats, x='genre', y='Num_Games', title='Number of Games by Genre')
 
@@ -268,7 +1600,7 @@ def update_summary(content, filename, start_date, end_date):
     graphs = html.Div([graph_html, graph_html2, graph_html3, graph_html4])
 
     #新的return（删了一个多的return）
-    return summary_text, num_games, num_genres, unique_developers, avg_plays, avg_rating, num_description, graphs
+    return num_games, num_genres, unique_developers, avg_plays, avg_rating, num_description, graphs, [dataset_id, start_date, end_date]
 
 
 
@@ -279,10 +1611,11 @@ def update_summary(content, filename, start_date, end_date):
     [Input('search-button', 'n_clicks'),  # Search button clicks
      Input('modal-close', 'n_clicks')],   # Close button clicks
     [State('search-bar', 'value'),        # Text input from the user
-     State('upload-data', 'contents')]    # Contents of the uploaded file
+     State('dataset-id', 'data')]         # Id of the uploaded dataset
 )
 
-def search_game(n_clicks_search, n_clicks_close, search_value, content):
+@instrumented
+def search_game(n_clicks_search, n_clicks_close, search_value, dataset_id):
     ctx = callback_context
 
     # Determine which button was clicked
@@ -291,31 +1624,28 @@ def search_game(n_clicks_search, n_clicks_close, search_value, content):
     else:
         button_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
-    # If the search button was clicked and there's valid input and file content
-    if button_id == 'search-button' and n_clicks_search and search_value and content:
-        content_type, content_string = content.split(',')
-        decoded = base64.b64decode(content_string)
-        df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
+    dataset = get_dataset(dataset_id)
 
-        # Normalize case for a case-insensitive full match
-        search_value_lower = search_value.lower()
-        df['name_lower'] = df['name'].str.lower()
+    # If the search button was clicked and there's valid input and file content
+    if button_id == 'search-button' and n_clicks_search and search_value and dataset is not None:
+        df = dataset['df']
 
-        # Check for a full match rather than a partial match
-        match_df = df[df['name_lower'] == search_value_lower]
+        # Case-insensitive full match through the name index, which keeps the first match in file order
+        position = find_game(dataset, search_value)
         
-        if not match_df.empty:
-            # Assuming the first match is the desired one
-            game_info = match_df.iloc[0][['name', 'date', 'genre', 'developer', 'platform', 'rating', 'wishlists', 'description']].to_dict()
+        if position is not None:
+            game_info = df.iloc[position][['name', 'date', 'genre', 'developer', 'platform', 'rating', 'wishlists']].to_dict()
+            # Descriptions are only decoded here
+            description = unpack_string(dataset['descriptions'], position)
             game_details = [
                 html.H4(game_info.get('name', 'No Name')),
-                html.P(f"Date: {game_info['date'] if pd.notna(game_info['date']) else 'No information available'}"),
+                html.P(f"Date: {game_info['date'].strftime('%Y-%m-%d') if pd.notna(game_info['date']) else 'No information available'}"),
                 html.P(f"Genre: {game_info['genre'] if pd.notna(game_info['genre']) else 'No information available'}"),
                 html.P(f"Developer: {game_info['developer'] if pd.notna(game_info['developer']) else 'No information available'}"),
                 html.P(f"Platform: {game_info['platform'] if pd.notna(game_info['platform']) else 'No information available'}"),
                 html.P(f"Rating: {game_info['rating'] if pd.notna(game_info['rating']) else 'No information available'}"),
                 html.P(f"Wishlists: {game_info['wishlists'] if pd.notna(game_info['wishlists']) else 'No information available'}"),
-                html.P(f"Description: {game_info['description'] if pd.notna(game_info['description']) else 'No information available'}"),
+                html.P(f"Description: {description if description is not None else 'No information available'}"),
             ]
             return {'display': 'block'}, game_details  # Show modal with details
         else:
@@ -333,275 +1663,195 @@ def search_game(n_clicks_search, n_clicks_close, search_value, content):
     
        
     
-#新增relationship
+# Callback to suggest game names while the user types in the search bar
 @app.callback(
-    Output('reviews-rating-chart', 'children'),
-    [Input('date-picker-range', 'start_date'),
-     Input('date-picker-range', 'end_date'),
-     Input('upload-data', 'contents')]
+    Output('search-suggestions', 'children'),
+    [Input('search-bar', 'value')],
+    [State('dataset-id', 'data')]
 )
-def update_reviews_rating_chart(start_date, end_date, contents):
-    if contents is None:
-        raise PreventUpdate
-    
-    # 解析上传的文件
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-    
-    # 过滤数据集以符合选择的日期范围
-    df['date'] = pd.to_datetime(df['date'])
-    filtered_df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-    
-    # 生成散点图
-    fig = px.scatter(filtered_df, x='reviews', y='rating', 
-                     title='Relationship between Number of Reviews and Rating',
-                     hover_data=['name'])  # 悬停时显示游戏名称
-    
-    # 转换图表为HTML元素
-    graph_html = dcc.Graph(figure=fig)
-    
-    return graph_html
+@instrumented
+def suggest_games(search_value, dataset_id):
+    dataset = get_dataset(dataset_id)
 
+    # Wait for two characters so short prefixes don't send huge lists
+    if dataset is None or not search_value or len(search_value) < 2:
+        return []
 
+    return [html.Option(value=name) for name in name_prefix_matches(dataset, search_value)]
 
 
+# Callback to show the rolling metrics in the debug panel (not instrumented itself)
 @app.callback(
-    Output('plays-playing-chart', 'children'),
-    [Input('date-picker-range', 'start_date'),
-     Input('date-picker-range', 'end_date'),
-     Input('upload-data', 'contents')]
+    Output('metrics-panel', 'children'),
+    [Input('metrics-refresh', 'n_clicks')]
 )
-def update_plays_playing_chart(start_date, end_date, contents):
-    if contents is None:
-        raise PreventUpdate
-    
-    # 解析上传的文件
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-    
-    # 过滤数据集以符合选择的日期范围
-    df['date'] = pd.to_datetime(df['date'])
-    filtered_df = df[(df['date'] >= start_date) & (df['date'] <= end_date)].copy()
-    
-    # 生成散点图
-    fig = px.scatter(filtered_df, x='plays', y='playing', 
-                     title='Relationship between Plays and Playing',
-                     hover_data=['name'])  # 悬停时显示游戏名称
-    
+def update_metrics_panel(n_clicks):
+    columns = ['count', 'mean', 'p50', 'p95', 'p99', 'max']
+    rows = [html.Tr([html.Th('callback'), html.Th('series')] + [html.Th(column) for column in columns] + [html.Th('histogram')])]
+    for callback, series in metrics_snapshot().items():
+        for name, summary in series.items():
+            rows.append(html.Tr([html.Td(callback), html.Td(name)] +
+                                [html.Td(f'{summary[column]:,.1f}' if column != 'count' else summary[column]) for column in columns] +
+                                [html.Td(histogram_bars(summary['histogram']) if 'histogram' in summary else '')]))
+    return html.Table(rows)
+
+
+def histogram_bars(histogram):
+    # One bar per METRICS_BUCKETS_MS bucket, scaled to the fullest bucket; hovering a bar shows its count
+    fullest = max(max(histogram.values()), 1)
+    bars = [html.Div(title=f'<= {bound} ms: {count}' if bound != 'inf' else f'> {METRICS_BUCKETS_MS[-1]} ms: {count}',
+                     style={'width': '6px', 'height': f'{max(count / fullest * 100, 2 if count else 0):.0f}%', 'backgroundColor': '#1f77b4'})
+            for bound, count in histogram.items()]
+    return html.Div(bars, style={'display': 'flex', 'alignItems': 'flex-end', 'gap': '1px', 'height': '24px'})
+
+
+# Scatter plots send at most SCATTER_POINT_BUDGET points to the browser. Above the budget the
+# most extreme games on each axis are always kept and the rest is a uniform random sample,
+# which keeps the point density of the full range; the trace switches to WebGL (Scattergl).
+SCATTER_POINT_BUDGET = 5000
+SCATTER_OUTLIER_SHARE = 0.1
+
+
+def downsample_scatter(filtered_df, x, y, budget=SCATTER_POINT_BUDGET):
+    if len(filtered_df) <= budget:
+        return filtered_df
+
+    # The largest and smallest values on each axis, missing values never count as extremes
+    per_side = max(int(budget * SCATTER_OUTLIER_SHARE) // 4, 1)
+    keep = np.zeros(len(filtered_df), dtype=bool)
+    for column in (x, y):
+        values = filtered_df[column].to_numpy(dtype='float64', na_value=np.nan)
+        keep[np.argpartition(np.where(np.isnan(values), -np.inf, values), -per_side)[-per_side:]] = True
+        keep[np.argpartition(np.where(np.isnan(values), np.inf, values), per_side)[:per_side]] = True
+
+    # Fixed seed so the same range always shows the same points
+    rest = np.flatnonzero(~keep)
+    rng = np.random.default_rng(0)
+    keep[rng.choice(rest, size=budget - int(keep.sum()), replace=False)] = True
+
+    return filtered_df.iloc[np.flatnonzero(keep)]
+
+
+def scatter_figure(filtered_df, x, y, title):
+    plot_df = downsample_scatter(filtered_df, x, y)
+    if len(plot_df) < len(filtered_df):
+        title = f'{title} ({len(plot_df):,} of {len(filtered_df):,} games shown)'
+        return px.scatter(plot_df, x=x, y=y, title=title, hover_data=['name'], render_mode='webgl')
+
+    return px.scatter(plot_df, x=x, y=y, title=title, hover_data=['name'])  # 悬停时显示游戏名称
+
+
+def reviews_rating_chart(filtered_df):
+    # 生成散点图（点数过多时降采样）
+    fig = scatter_figure(filtered_df, x='reviews', y='rating',
+                         title='Relationship between Number of Reviews and Rating')
+
     # 转换图表为HTML元素
-    graph_html = dcc.Graph(figure=fig)
-    
-    return graph_html
+    return dcc.Graph(figure=fig)
 
-@app.callback(
-    Output('rating-comparison-chart', 'figure'),
-    [Input('date-picker-range', 'start_date'),
-     Input('date-picker-range', 'end_date'),
-     Input('upload-data', 'contents')]
-)
-def update_rating_comparison_chart(start_date, end_date, contents):
-    if contents is None:
-        raise PreventUpdate
 
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
+def plays_playing_chart(filtered_df):
+    # 生成散点图（点数过多时降采样）
+    fig = scatter_figure(filtered_df, x='plays', y='playing',
+                         title='Relationship between Plays and Playing')
+
+    # 转换图表为HTML元素
+    return dcc.Graph(figure=fig)
 
-    df['date'] = pd.to_datetime(df['date'])
-    filtered_df = df[(df['date'] >= start_date) & (df['date'] <= end_date)].copy()
 
-    # Identify the developer category based on inclusion of Sony, Microsoft, or Nintendo
-    conditions = [
-        filtered_df['developer'].str.contains('Sony', case=False, na=False),
-        filtered_df['developer'].str.contains('Microsoft', case=False, na=False),
-        filtered_df['developer'].str.contains('Nintendo', case=False, na=False)
-    ]
-    choices = ['Sony', 'Microsoft', 'Nintendo']
-    filtered_df['Developer Category'] = np.select(conditions, choices, default='Others').copy()
+def rating_comparison_figure(dataset, lo, hi):
+    # Developer category (Sony, Microsoft, Nintendo or Others) looked up in the developer dimension
+    plot_df = pd.DataFrame({
+        'Developer Category': developer_categories(dataset, lo, hi),
+        'rating': dataset['df']['rating'].to_numpy()[lo:hi],
+    })
 
     # Plotting the box plot
-    fig = px.box(filtered_df, x='Developer Category', y='rating', title='Rating Distribution by Developer Category')
+    return px.box(plot_df, x='Developer Category', y='rating', title='Rating Distribution by Developer Category')
 
-    return fig
 
+#新增relationship
+# Relationship tab: the date range is sliced once and shared by the tab's three charts
 @app.callback(
-    Output('genre-distribution-chart', 'figure'),
+    [Output('reviews-rating-chart', 'children'),
+     Output('plays-playing-chart', 'children'),
+     Output('rating-comparison-chart', 'figure'),
+     Output('relationship-rendered', 'data')],
     [Input('date-picker-range', 'start_date'),
      Input('date-picker-range', 'end_date'),
-     Input('upload-data', 'contents')]
+     Input('dataset-id', 'data'),
+     Input('tabs', 'value')],
+    [State('relationship-rendered', 'data')]
 )
-def update_genre_distribution_chart(start_date, end_date, contents):
-    if contents is None:
+@instrumented
+def update_relationship_tab(start_date, end_date, dataset_id, active_tab, rendered):
+    # 从数据缓存中读取已解析的数据
+    dataset = get_dataset(dataset_id)
+    render_key = [dataset_id, start_date, end_date]
+    if dataset is None or not tab_needs_render('relationship', active_tab, rendered, render_key):
         raise PreventUpdate
-    
-    # 解析上传的文件
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
 
     # 过滤数据集以符合选择的日期范围
-    df['date'] = pd.to_datetime(df['date'])
-    filtered_df = df[(df['date'] >= pd.to_datetime(start_date)) & (df['date'] <= pd.to_datetime(end_date))].copy()
-    
-    # 拆分 'genre' 列中的字符串为列表
-    filtered_df['genre'] = filtered_df['genre'].str.split(', ')
-    
-    # 展开这些列表为新的行
-    exploded_df = filtered_df.explode('genre')
-    
-    # 按 'genre' 分组并计算每个 'genre' 的游戏数量
-    genre_counts = exploded_df['genre'].value_counts().reset_index()
-    genre_counts.columns = ['genre', 'count']
-    
-    # 使用 Plotly Express 或 Graph Objects 构造图表
-    fig = px.bar(genre_counts, x="genre", y="count", title="Genre Distribution")
-    
-    return fig  # 直接返回构造好的图表对象
+    lo, hi = date_range_positions(dataset, start_date, end_date)
+    filtered_df = dataset['df'].iloc[lo:hi]
 
+    with timed_stage('figures'):
+        return reviews_rating_chart(filtered_df), plays_playing_chart(filtered_df), rating_comparison_figure(dataset, lo, hi), render_key
 
 
-@app.callback(
-    Output('genre-rating-chart', 'children'),  # 确保你的布局中有一个与此ID相对应的组件
-    [Input('date-picker-range', 'start_date'),
-     Input('date-picker-range', 'end_date'),
-     Input('upload-data', 'contents')]
-)
-def update_genre_rating_chart(start_date, end_date, contents):
-    if contents is None:
-        raise PreventUpdate
+def genre_distribution_figure(genre_stats):
+    # 按 'genre' 计算所选日期范围内每个 'genre' 的游戏数量
+    genre_counts = genre_counts_by_count(genre_stats)
 
-    # 解析上传的文件
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-
-    # 过滤数据集以符合选择的日期范围
-    df['date'] = pd.to_datetime(df['date'])
-    filtered_df = df[(df['date'] >= pd.to_datetime(start_date)) & (df['date'] <= pd.to_datetime(end_date))].copy()
-
-    # 拆分 'genre' 列中的字符串为列表
-    filtered_df['genre'] = filtered_df['genre'].str.split(', ')
+    # 使用 Plotly Express 或 Graph Objects 构造图表
+    return px.bar(genre_counts, x="genre", y="count", title="Genre Distribution")
 
-    # 展开这些列表为新的行
-    exploded_df = filtered_df.explode('genre')
 
-    # 按 'genre' 分组并计算每个 'genre' 的平均评分
-    genre_avg_rating = exploded_df.groupby('genre')['rating'].mean().reset_index()
-    genre_avg_rating.columns = ['genre', 'average_rating']
+def genre_rating_chart(genre_stats):
+    # 按 'genre' 计算所选日期范围内每个 'genre' 的平均评分
+    genre_avg_rating = genre_stats[['genre', 'average_rating']]
 
     # 找出平均评分前三的 'genre'
     top_genres = genre_avg_rating.nlargest(3, 'average_rating')['genre']
 
     # 为平均评分前三的 'genre' 设置颜色，其它的 'genre' 使用默认颜色
-    genre_avg_rating['color'] = genre_avg_rating['genre'].apply(lambda x: 'Top 3' if x in top_genres.values else 'Other')
+    genre_avg_rating = genre_avg_rating.assign(color=genre_avg_rating['genre'].apply(lambda x: 'Top 3' if x in top_genres.values else 'Other'))
 
     # 生成条形图，并使用颜色列来定义每个条形的颜色
     fig = px.bar(genre_avg_rating, x='genre', y='average_rating', 
                  title='Average Rating by Genre in Selected Date Range'
                  )
 
-    # 返回图表
     return dcc.Graph(figure=fig)
 
 
-@app.callback(
-    Output('genre-reviews-chart', 'children'),
-    [Input('date-picker-range', 'start_date'),
-     Input('date-picker-range', 'end_date'),
-     Input('upload-data', 'contents')]
-)
-def update_genre_reviews_chart(start_date, end_date, contents):
-    if contents is None:
-        raise PreventUpdate
-
-    # 解析上传的文件
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-
-    # 过滤数据集以符合选择的日期范围
-    df['date'] = pd.to_datetime(df['date'])
-    filtered_df = df[(df['date'] >= pd.to_datetime(start_date)) & (df['date'] <= pd.to_datetime(end_date))].copy()
-
-    # 拆分 'genre' 列中的字符串为列表
-    filtered_df['genre'] = filtered_df['genre'].str.split(', ')
-
-    # 展开这些列表为新的行
-    exploded_df = filtered_df.explode('genre')
-
-    # 按 'genre' 分组并计算每个 'genre' 的平均评论数
-    genre_avg_reviews = exploded_df.groupby('genre')['reviews'].mean().reset_index()
-    genre_avg_reviews.columns = ['genre', 'average_reviews']
+def genre_reviews_chart(genre_stats):
+    # 按 'genre' 计算所选日期范围内每个 'genre' 的平均评论数
+    genre_avg_reviews = genre_stats[['genre', 'average_reviews']]
 
     # 找出平均评论数前三的 'genre'
     top_genres_reviews = genre_avg_reviews.nlargest(3, 'average_reviews')['genre']
 
     # 为平均评论数前三的 'genre' 设置颜色，其它的 'genre' 使用默认颜色
-    genre_avg_reviews['color'] = genre_avg_reviews['genre'].apply(lambda x: 'Top 3' if x in top_genres_reviews.values else 'Other')
+    genre_avg_reviews = genre_avg_reviews.assign(color=genre_avg_reviews['genre'].apply(lambda x: 'Top 3' if x in top_genres_reviews.values else 'Other'))
 
     # 生成条形图，并使用颜色列来定义每个条形的颜色
     fig = px.bar(genre_avg_reviews, x='genre', y='average_reviews',
                  title='Average Reviews by Genre in Selected Date Range'
                  )
 
-    # 返回图表
     return dcc.Graph(figure=fig)
 
 
-
-
-@app.callback(
-    Output('top-games-by-plays', 'children'),  # 输出到一个展示游戏名称列表的容器
-    [Input('genre-distribution-chart', 'clickData'),     # 监听条形图的点击事件
-     Input('upload-data', 'contents')]          # 同时需要原始数据
-)
-def display_top_games_by_plays(clickData, contents):
-    if clickData is None or contents is None:
-        raise PreventUpdate
-
-    # 解析上传的文件内容
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-
-    # 获取被点击的 'genre'
-    genre_clicked = clickData['points'][0]['x']
-
-    # 筛选出该 'genre' 的所有游戏并按plays排序，取前五名
-    top_games = df[df['genre'].str.contains(genre_clicked, na=False)].nlargest(5, 'plays')[['name', 'plays']]
-
-    # 生成游戏名称列表
-    children = [html.Div(f"{name}: {plays}", style={'margin': '5px'}) for name, plays in zip(top_games['name'], top_games['plays'])]
-
-    # 返回名称列表
-    return children
-
-
-@app.callback(
-    Output('output-progress', 'children'),
-    [Input('upload-data', 'contents'),
-     Input('date-picker-range', 'start_date'),
-     Input('date-picker-range', 'end_date')]
-)
-def update_output(contents, start_date, end_date):
-    if contents is None or start_date is None or end_date is None:
+def rating_progress(dataset, start_date, end_date):
+    if start_date is None or end_date is None:
         return 'Please upload a file and select a date range.'
 
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-
-    # 确保 'date' 列是日期格式
-    df['date'] = pd.to_datetime(df['date'])
-
-    # 筛选选中的时间段和 rating 大于 4 的游戏
-    filtered_df = df[(df['date'] >= start_date) & (df['date'] <= end_date) & (df['rating'] > 3.5)]
+    # 选中时间段内 rating 大于 3.5 的游戏数和游戏总数
+    totals = range_totals(dataset, *date_range_positions(dataset, start_date, end_date))
+    high_rating_games, total_games = int(totals['high_rating']), int(totals['rows'])
 
     # 计算百分比
-    total_games = len(df[(df['date'] >= start_date) & (df['date'] <= end_date)])
-    high_rating_games = len(filtered_df)
     if total_games > 0:
         percentage = (high_rating_games / total_games) * 100
     else:
@@ -617,54 +1867,100 @@ def update_output(contents, start_date, end_date):
     ])
 
 
+def platform_distribution_figure(platform_counts):
+    # 使用 Plotly Express 构造饼状图
+    return px.pie(platform_counts, names="platform", values="count", title="Platform Distribution within Selected Date Range")
+
+
+# Feedback tab: one callback builds every chart of the tab from the same genre statistics,
+# which come from a single pass over the genre cells of the date range
 @app.callback(
-    Output('platform-distribution-pie', 'figure'),  # 注意更改输出组件ID
+    [Output('genre-distribution-chart', 'figure'),
+     Output('genre-rating-chart', 'children'),
+     Output('genre-reviews-chart', 'children'),
+     Output('output-progress', 'children'),
+     Output('platform-distribution-pie', 'figure'),
+     Output('feedback-rendered', 'data'),
+     Output('feedback-job', 'data'),
+     Output('feedback-job-interval', 'disabled'),
+     Output('feedback-job-progress', 'children')],
     [Input('date-picker-range', 'start_date'),
      Input('date-picker-range', 'end_date'),
-     Input('upload-data', 'contents')]
+     Input('dataset-id', 'data'),
+     Input('tabs', 'value'),
+     Input('feedback-job-interval', 'n_intervals')],
+    [State('feedback-rendered', 'data'),
+     State('feedback-job', 'data')]
 )
-def update_platform_distribution_pie(start_date, end_date, contents):
-    if contents is None:
-        raise PreventUpdate
-    
-    # 解析上传的文件
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-
-    # 转换日期格式并按照指定日期范围过滤数据
-    df['date'] = pd.to_datetime(df['date'])
-    filtered_df = df[(df['date'] >= pd.to_datetime(start_date)) & (df['date'] <= pd.to_datetime(end_date))]
-
-    # 拆分 'platform' 列中的字符串为列表
-    filtered_df['platform'] = filtered_df['platform'].str.split(', ')
-    
-    # 展开这些列表为新的行，使每行只包含一个平台
-    exploded_df = filtered_df.explode('platform')
-
-    # 将非“Windows PC”, “Linux”, “Web browser”的所有平台替换为“others”
-    specified_platforms = ['Windows PC', 'Linux', 'Web browser']
-    exploded_df['platform'] = exploded_df['platform'].apply(lambda x: x if x in specified_platforms else 'others')
-
-    # 按 'platform' 分组并计算每个平台的游戏数量
-    platform_counts = exploded_df['platform'].value_counts().reset_index()
-    platform_counts.columns = ['platform', 'count']
-    
-    # 使用 Plotly Express 构造饼状图
-    fig = px.pie(platform_counts, names="platform", values="count", title="Platform Distribution within Selected Date Range")
-
-    return fig  # 直接返回构造好的图表对象
+@instrumented
+def update_feedback_tab(start_date, end_date, dataset_id, active_tab, n_intervals, rendered, job):
+    # 从数据缓存中读取已解析的数据
+    dataset = get_dataset(dataset_id)
+    if dataset is None:
+        # Charts keep their content, only the progress text asks for an upload
+        return (dash.no_update, dash.no_update, dash.no_update, 'Please upload a file and select a date range.', dash.no_update, None) + stop_background_job(job)
+
+    # The charts are computed by the 'feedback' background job
+    render_key = [dataset_id, start_date, end_date]
+    result, job_outputs = background_job('feedback', render_key, tab_needs_render('feedback', active_tab, rendered, render_key), job)
+    if result is None:
+        return (dash.no_update,) * 6 + job_outputs
+    return result + job_outputs
+
+
+def compute_feedback(set_progress, dataset_id, start_date, end_date):
+    # Charts of the Feedback tab, with the render key they were drawn for
+    dataset = get_dataset(dataset_id)
+    if dataset is None:
+        return None
+    set_progress(0, 2)
+
+    # 所选日期范围内每个 'genre' 的游戏数量、平均评分和平均评论数（结果已缓存）
+    genre_stats = get_aggregate(dataset_id, dataset, start_date, end_date, 'genre_stats')
+    # 将非“Windows PC”, “Linux”, “Web browser”的所有平台归为“others”，并计算每个平台的游戏数量（结果已缓存）
+    platform_counts = get_aggregate(dataset_id, dataset, start_date, end_date, 'platform_counts')
+    set_progress(1, 2)
+
+    with timed_stage('figures'):
+        return (genre_distribution_figure(genre_stats),
+                genre_rating_chart(genre_stats),
+                genre_reviews_chart(genre_stats),
+                rating_progress(dataset, start_date, end_date),
+                platform_distribution_figure(platform_counts),
+                [dataset_id, start_date, end_date])
+
+
+# Computations run by background jobs, by job name
+JOBS = {
+    'overview': compute_overview,
+    'feedback': compute_feedback,
+}
 
 
+@app.callback(
+    Output('top-games-by-plays', 'children'),  # 输出到一个展示游戏名称列表的容器
+    [Input('genre-distribution-chart', 'clickData'),     # 监听条形图的点击事件
+     Input('dataset-id', 'data')]               # 同时需要上传数据的 id
+)
+@instrumented
+def display_top_games_by_plays(clickData, dataset_id):
+    # 从数据缓存中读取已解析的数据
+    dataset = get_dataset(dataset_id)
+    if clickData is None or dataset is None:
+        raise PreventUpdate
 
+    # 获取被点击的 'genre'
+    genre_clicked = clickData['points'][0]['x']
 
-import numpy as np
-import pandas as pd
-import plotly.express as px
-from dash import Dash, html, dcc, Input, Output, callback  # 根据您的Dash版本，导入方式可能略有不同
+    # 从加载时建立的索引中取出该 'genre' 按 plays 排序的前五名（精确匹配 genre）
+    # 同 plays 的游戏按文件中的原始顺序排列
+    top_games = top_games_by_genre(dataset, genre_clicked)
 
-# 假设以下是您Dash应用的一部分
+    # 生成游戏名称列表
+    children = [html.Div(f"{name}: {plays}", style={'margin': '5px'}) for name, plays in zip(top_games['name'], top_games['plays'])]
 
+    # 返回名称列表
+    return children
 
 
 
@@ -0,0 +1,79 @@
+# Production entry point: the dashboard on several gunicorn worker processes instead of the
+# single debug server of 5202_Project.py. Parsed datasets are published to a shared directory
+# and memory-mapped by every worker, so RAM per dataset does not grow with the number of workers.
+#
+#   python 5202_Serve.py --workers 4 --threads 4 --bind 0.0.0.0:8050
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import re
+import tempfile
+
+
+def default_shared_dir():
+    # In memory on Linux, so the published files are only ever in the page cache
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'games-dashboard')
+
+
+# Names of the files 5202_Project.py writes to the shared directory, per subdirectory: published datasets
+# and their temporary files (named by the 40-hex dataset id), the state, results and lock of background
+# jobs (named by the 40-hex job hash), and the metrics of each worker (named by its pid)
+SHARED_FILE_NAMES = {
+    '': re.compile(r'[0-9a-f]{40}\.(arrow|arrays|layout)(\.\d+\.tmp)?'),
+    'jobs': re.compile(r'[0-9a-f]{40}\.(json|pickle)(\.[0-9a-f]+)?(\.tmp)?|\.lock'),
+    'metrics': re.compile(r'\d+\.json(\.tmp)?'),
+}
+
+
+def clear_shared_dir(shared_dir):
+    # Datasets, jobs and metrics of an earlier run would stay in RAM (and count against the shared size bound)
+    # with nobody using them. Only files named like the dashboard's own are deleted, so a --shared-dir that
+    # also holds other files keeps them.
+    for subdirectory, names in SHARED_FILE_NAMES.items():
+        directory = os.path.join(shared_dir, subdirectory)
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if entry.is_file() and names.fullmatch(entry.name):
+                os.remove(entry.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the games dashboard with several worker processes.')
+    parser.add_argument('--bind', default='127.0.0.1:8050', help='address and port to listen on')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='request threads per worker')
+    parser.add_argument('--timeout', type=int, default=120, help='seconds before a busy worker is restarted (large uploads)')
+    parser.add_argument('--shared-dir', default=default_shared_dir(), help='directory the parsed datasets are published to')
+    args = parser.parse_args()
+
+    # Read by 5202_Project.py when it is imported below
+    os.makedirs(args.shared_dir, exist_ok=True)
+    clear_shared_dir(args.shared_dir)
+    os.environ['GAMES_DASHBOARD_SHARED_DIR'] = args.shared_dir
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit('gunicorn is not installed (pip install gunicorn); it is needed for multi-process serving')
+
+    class DashboardApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', args.bind)
+            self.cfg.set('workers', args.workers)
+            self.cfg.set('threads', args.threads)
+            self.cfg.set('timeout', args.timeout)
+            # Import the app once in the master; the forked workers share its pages
+            self.cfg.set('preload_app', True)
+
+        def load(self):
+            return importlib.import_module('5202_Project').server
+
+    DashboardApplication().run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# Start-up time of the dashboard: how long a fresh worker takes to import 5202_Project.py,
+# with an import-time profile of the packages it pulls in. Exits with status 1 when the
+# median import time is over the budget, so it can gate changes to the imports.
+#
+#   python 5202_Startup.py --repeat 5 --budget 1.5
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Median seconds to import the dashboard in a fresh interpreter
+STARTUP_BUDGET_SECONDS = 1.5
+
+# Imports the app the way 5202_Serve.py does and prints the seconds it took
+IMPORT_APP = """
+import importlib, sys, time
+sys.path.insert(0, {here!r})
+start = time.perf_counter()
+importlib.import_module('5202_Project')
+print(time.perf_counter() - start)
+"""
+
+
+def import_seconds():
+    # One fresh interpreter importing the app
+    completed = subprocess.run([sys.executable, '-c', IMPORT_APP.format(here=HERE)],
+                               capture_output=True, text=True, check=True, cwd=HERE)
+    return float(completed.stdout.strip().splitlines()[-1])
+
+
+def import_profile():
+    # {top-level package: cumulative seconds} from `python -X importtime`, slowest first
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', IMPORT_APP.format(here=HERE)],
+                               capture_output=True, text=True, check=True, cwd=HERE)
+    packages = defaultdict(float)
+    for line in completed.stderr.splitlines():
+        # 'import time:  self [us] | cumulative | imported package', nested imports are indented
+        if not line.startswith('import time:') or line.endswith('imported package'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Only the imports made directly by the app (or by site) count, nested ones are in their cumulative time
+        if name.startswith('  '):
+            continue
+        packages[name.strip().split('.')[0]] += int(cumulative) / 1e6
+    return sorted(packages.items(), key=lambda item: -item[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure and profile the import time of the dashboard.')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters to time')
+    parser.add_argument('--budget', type=float, default=STARTUP_BUDGET_SECONDS, help='median import seconds allowed')
+    parser.add_argument('--top', type=int, default=15, help='packages listed in the import-time profile')
+    args = parser.parse_args()
+
+    print('Import-time profile (python -X importtime, cumulative per top-level package)')
+    for package, seconds in import_profile()[:args.top]:
+        print(f"  {package:<32} {seconds * 1000:>10.1f} ms")
+
+    timings = [import_seconds() for _ in range(args.repeat)]
+    median = statistics.median(timings)
+    print(f"Import of 5202_Project.py: median {median * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms over {args.repeat} runs")
+
+    if median > args.budget:
+        print(f"Over the start-up budget of {args.budget * 1000:.0f} ms")
+        raise SystemExit(1)
+    print(f"Within the start-up budget of {args.budget * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()